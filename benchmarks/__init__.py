@@ -0,0 +1,55 @@
+"""
+Benchmarks for django-multiform.
+
+They use the test project's settings (in-memory SQLite) and can be run
+from the project root directory, for example::
+
+    $ python -m benchmarks.bench_init
+"""
+from __future__ import print_function, unicode_literals
+
+from timeit import default_timer
+import os
+import timeit
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tests.settings')
+    import django
+    if hasattr(django, 'setup'):
+        django.setup()
+
+
+def setup_database():
+    """
+    Create the tables of the test models in the (in-memory) test database.
+    """
+    from django.db import connection
+    connection.creation.create_test_db(verbosity=0)
+
+
+def best_of(func, number=1000, repeat=5):
+    """
+    Return the best time (in microseconds) for a single call to func.
+    """
+    timings = timeit.repeat(func, number=number, repeat=repeat)
+    return min(timings) / number * 1e6
+
+
+def time_per_call(make, func, number=100, repeat=5):
+    """
+    Call ``make`` ``number`` times to build the arguments, then time calling
+    ``func`` on each of them.
+    Return the best and the mean time (in microseconds) for a single call
+    to func, over ``repeat`` runs.
+    This is useful for operations whose results are cached (like the
+    validation of a form), which need a fresh object for each call.
+    """
+    timings = []
+    for _ in range(repeat):
+        objects = [make() for _ in range(number)]
+        start = default_timer()
+        for obj in objects:
+            func(obj)
+        timings.append((default_timer() - start) / number * 1e6)
+    return min(timings), sum(timings) / len(timings)
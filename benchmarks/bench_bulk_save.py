@@ -0,0 +1,64 @@
+"""
+Compare MultiModelForm.bulk_save with validating and saving each multiform
+in a loop, on SQLite.
+"""
+from __future__ import print_function, unicode_literals
+
+from benchmarks import setup_django, setup_database, best_of
+
+setup_django()
+setup_database()
+
+from django.db import connection  # noqa
+from django.test.utils import CaptureQueriesContext  # noqa
+
+from tests.forms import ToppingMultiModelForm  # noqa
+from tests.models import Pizza, Topping  # noqa
+
+
+def make_data_list(n):
+    return [{'pizza-name': 'pizza %d' % i, 'topping-name': 'topping %d' % i}
+            for i in range(n)]
+
+
+def save_in_loop(data_list):
+    for data in data_list:
+        form = ToppingMultiModelForm(data)
+        if form.is_valid():
+            form.save()
+
+
+def save_in_bulk(data_list):
+    ToppingMultiModelForm.bulk_save(data_list)
+
+
+def count_queries(func, data_list):
+    with CaptureQueriesContext(connection) as queries:
+        func(data_list)
+    return len(queries.captured_queries)
+
+
+def cleanup():
+    Topping.objects.all().delete()
+    Pizza.objects.all().delete()
+
+
+def main():
+    print('%8s %12s %12s %10s %10s' % ('rows', 'loop ms', 'bulk ms',
+                                       'loop qs', 'bulk qs'))
+    for n in (10, 100, 500):
+        data_list = make_data_list(n)
+        timings = []
+        for func in (save_in_loop, save_in_bulk):
+            timings.append(best_of(lambda: (func(data_list), cleanup()),
+                                   number=1, repeat=3) / 1000)
+        loop_queries = count_queries(save_in_loop, data_list)
+        cleanup()
+        bulk_queries = count_queries(save_in_bulk, data_list)
+        cleanup()
+        print('%8d %12.1f %12.1f %10d %10d' % (
+            n, timings[0], timings[1], loop_queries, bulk_queries))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Compare the construction of a MultiForm using its compiled InitPlan with
+the previous implementation that rebuilt everything on each instanciation.
+"""
+from __future__ import print_function, unicode_literals
+
+from benchmarks import setup_django, best_of
+
+setup_django()
+
+from collections import defaultdict, OrderedDict  # noqa
+from itertools import chain  # noqa
+
+from django import forms  # noqa
+
+from multiform import MultiForm, InvalidArgument  # noqa
+
+
+class SmallForm(forms.Form):
+    name = forms.CharField()
+
+
+class UncompiledMixin(object):
+    """The per-instance dispatching used before InitPlan existed."""
+
+    def _init_wrapped_forms(self, sig_kwargs, extra_kwargs):
+        base_forms = OrderedDict(self.base_forms)
+        dispatched_kwargs = defaultdict(dict)
+        for k in list(extra_kwargs):
+            prefix, _, remainder = k.partition('__')
+            if remainder and prefix in base_forms:
+                dispatched_kwargs[prefix][remainder] = extra_kwargs.pop(k)
+
+        self.forms = OrderedDict()
+        for name, form_class in base_forms.items():
+            kwargs = {}
+            for k, v in chain(sig_kwargs.items(), extra_kwargs.items()):
+                if hasattr(self, 'dispatch_init_%s' % k):
+                    v = getattr(self, 'dispatch_init_%s' % k)(name, v)
+                    if v is InvalidArgument:
+                        continue
+                kwargs[k] = v
+            kwargs.update(dispatched_kwargs[name])
+            self.forms[name] = form_class(**kwargs)
+
+
+def make_classes(n):
+    attrs = {'base_forms': [('form%d' % i, SmallForm) for i in range(n)]}
+    compiled = type(str('Compiled%d' % n), (MultiForm,), attrs)
+    uncompiled = type(str('Uncompiled%d' % n),
+                      (UncompiledMixin, MultiForm), attrs)
+    return compiled, uncompiled
+
+
+def main():
+    print('%8s %14s %14s %8s' % ('forms', 'uncompiled us', 'compiled us',
+                                 'saved'))
+    for n in (1, 5, 10, 25, 50):
+        compiled, uncompiled = make_classes(n)
+        data = {'form0-name': 'foo'}
+        number = max(10, 2000 // n)
+        before = best_of(lambda: uncompiled(data), number=number)
+        after = best_of(lambda: compiled(data), number=number)
+        print('%8d %14.1f %14.1f %7.1f%%' % (
+            n, before, after, 100 * (before - after) / before))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Measure (with tracemalloc) the memory allocated to build and render a large
+multiform, with and without MultiForm.share_fields.
+"""
+from __future__ import print_function, unicode_literals
+
+from benchmarks import setup_django
+
+setup_django()
+
+import tracemalloc  # noqa
+
+from django import forms  # noqa
+
+from multiform import MultiForm  # noqa
+
+
+def make_multiform_class(forms_count, fields_count, share_fields):
+    fields = dict(('field%d' % i, forms.ChoiceField(
+        choices=[(str(j), 'choice %d' % j) for j in range(10)],
+        required=False)) for i in range(fields_count))
+    form_class = type(str('Form%d' % fields_count), (forms.Form,), fields)
+    return type(str('MultiForm'), (MultiForm,), {
+        'base_forms': [('form%d' % i, form_class)
+                       for i in range(forms_count)],
+        'share_fields': share_fields,
+    })
+
+
+def allocated(multiform_class, data, render):
+    multiform_class(data).as_table()  # warm up (class-level caches)
+    tracemalloc.start()
+    form = multiform_class(data)
+    form.is_valid()
+    if render:
+        form.as_table()
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del form
+    return size, peak
+
+
+def main():
+    print('%8s %8s %8s %14s %14s %8s' % (
+        'forms', 'fields', 'render', 'copied KiB', 'shared KiB', 'saved'))
+    for forms_count, fields_count in [(5, 10), (20, 30), (50, 50)]:
+        data = {'form0-field0': '1'}
+        for render in (False, True):
+            sizes = []
+            for share_fields in (False, True):
+                multiform_class = make_multiform_class(
+                    forms_count, fields_count, share_fields)
+                sizes.append(allocated(multiform_class, data, render)[0])
+            print('%8d %8d %8s %14.1f %14.1f %7.1f%%' % (
+                forms_count, fields_count, render,
+                sizes[0] / 1024, sizes[1] / 1024,
+                100 * (sizes[0] - sizes[1]) / sizes[0]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,252 @@
+"""
+Benchmark suite for the hot paths of MultiForm and MultiModelForm.
+
+Each benchmark is run for every combination of its parameters (number of
+wrapped forms, number of fields per wrapped form, size of the submitted
+values) and the results are written as JSON so that releases can be
+compared::
+
+    $ python -m benchmarks.suite --output new.json
+    $ python -m benchmarks.suite --compare old.json --threshold 1.2
+
+With ``--compare``, the exit status is 1 if any benchmark got slower than
+``threshold`` times its previous time.
+"""
+from __future__ import print_function, unicode_literals
+
+from benchmarks import setup_django, setup_database, time_per_call
+
+setup_django()
+setup_database()
+
+from collections import OrderedDict  # noqa
+import argparse  # noqa
+import itertools  # noqa
+import json  # noqa
+import platform  # noqa
+import sys  # noqa
+
+import django  # noqa
+from django import forms  # noqa
+
+from multiform import MultiForm  # noqa
+
+from tests.forms import ToppingMultiModelForm  # noqa
+from tests.models import Pizza, Topping  # noqa
+
+
+SWEEPS = {
+    'forms': [1, 5, 20],
+    'fields': [1, 10, 50],
+    'payload': [10, 1000],
+}
+QUICK_SWEEPS = {
+    'forms': [1, 5],
+    'fields': [1, 10],
+    'payload': [10],
+}
+
+BENCHMARKS = OrderedDict()
+
+
+def benchmark(*params):
+    """
+    Register a benchmark that depends on the given sweep parameters.
+    The decorated function is given the values of the parameters and returns
+    two functions: one that builds a fresh object and the one that's timed.
+    """
+    def decorator(func):
+        BENCHMARKS[func.__name__] = (func, params)
+        return func
+    return decorator
+
+
+_multiform_classes = {}
+
+
+def make_multiform_class(forms_count, fields_count):
+    key = (forms_count, fields_count)
+    if key not in _multiform_classes:
+        fields = dict(('field%d' % i, forms.CharField(required=False))
+                      for i in range(fields_count))
+        fields['Media'] = type(str('Media'), (), {'js': ['sub.js']})
+        form_class = type(str('Form%d' % fields_count), (forms.Form,), fields)
+        base_forms = [('form%d' % i, form_class) for i in range(forms_count)]
+        _multiform_classes[key] = type(
+            str('MultiForm%dx%d' % key), (MultiForm,),
+            {'base_forms': base_forms})
+    return _multiform_classes[key]
+
+
+def make_data(forms_count, fields_count, payload):
+    value = 'x' * payload
+    return dict(('form%d-field%d' % (i, j), value)
+                for i in range(forms_count) for j in range(fields_count))
+
+
+@benchmark('forms', 'fields')
+def construction(forms, fields):
+    multiform_class = make_multiform_class(forms, fields)
+    data = make_data(forms, fields, 10)
+    return lambda: None, lambda _: multiform_class(data)
+
+
+@benchmark('forms', 'fields', 'payload')
+def full_clean(forms, fields, payload):
+    multiform_class = make_multiform_class(forms, fields)
+    data = make_data(forms, fields, payload)
+    return lambda: multiform_class(data), lambda form: form.full_clean()
+
+
+@benchmark('forms', 'fields')
+def as_table(forms, fields):
+    multiform_class = make_multiform_class(forms, fields)
+    return multiform_class, lambda form: form.as_table()
+
+
+@benchmark('forms', 'fields')
+def as_p(forms, fields):
+    multiform_class = make_multiform_class(forms, fields)
+    return multiform_class, lambda form: form.as_p()
+
+
+@benchmark('forms')
+def media(forms):
+    multiform_class = make_multiform_class(forms, 1)
+    return multiform_class, lambda form: form.media
+
+
+@benchmark('forms', 'fields')
+def iter_fields(forms, fields):
+    multiform_class = make_multiform_class(forms, fields)
+    return multiform_class, list
+
+
+@benchmark('forms', 'fields')
+def hidden_fields(forms, fields):
+    multiform_class = make_multiform_class(forms, fields)
+    return multiform_class, lambda form: form.hidden_fields()
+
+
+@benchmark('forms', 'fields')
+def visible_fields(forms, fields):
+    multiform_class = make_multiform_class(forms, fields)
+    return multiform_class, lambda form: form.visible_fields()
+
+
+@benchmark('forms', 'fields', 'payload')
+def changed_data(forms, fields, payload):
+    multiform_class = make_multiform_class(forms, fields)
+    data = make_data(forms, fields, payload)
+    return lambda: multiform_class(data), lambda form: form.changed_data
+
+
+@benchmark()
+def model_save():
+    data = {'pizza-name': 'Plain', 'topping-name': 'tomato sauce'}
+
+    def make():
+        form = ToppingMultiModelForm(data)
+        form.is_valid()
+        return form
+    return make, lambda form: form.save()
+
+
+def cleanup():
+    Topping.objects.all().delete()
+    Pizza.objects.all().delete()
+
+
+def run(sweeps, number, repeat, names=None):
+    results = []
+    for name, (func, params) in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        for values in itertools.product(*[sweeps[p] for p in params]):
+            kwargs = dict(zip(params, values))
+            make, timed = func(**kwargs)
+            best, mean = time_per_call(make, timed, number, repeat)
+            cleanup()
+            results.append(OrderedDict([
+                ('benchmark', name),
+                ('params', kwargs),
+                ('best_us', round(best, 3)),
+                ('mean_us', round(mean, 3)),
+                ('number', number),
+                ('repeat', repeat),
+            ]))
+            print('%-14s %-40s %12.1f us' % (name, kwargs, best),
+                  file=sys.stderr)
+    return results
+
+
+def result_key(result):
+    return (result['benchmark'], tuple(sorted(result['params'].items())))
+
+
+def compare(old_results, new_results, threshold):
+    """
+    Print the ratio between the new and old times of the benchmarks that are
+    in both results. Return the keys of the ones that regressed.
+    """
+    old = dict((result_key(result), result) for result in old_results)
+    regressions = []
+    for result in new_results:
+        key = result_key(result)
+        if key not in old:
+            continue
+        ratio = result['best_us'] / old[key]['best_us']
+        flag = ''
+        if ratio > threshold:
+            regressions.append(key)
+            flag = ' REGRESSION'
+        print('%-14s %-40s %6.2fx%s' % (result['benchmark'], result['params'],
+                                        ratio, flag))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--output', help='File to write the JSON results to '
+                        '(default: standard output).')
+    parser.add_argument('--compare', help='JSON results to compare with.')
+    parser.add_argument('--threshold', type=float, default=1.2)
+    parser.add_argument('--quick', action='store_true',
+                        help='Use smaller sweeps and fewer iterations.')
+    parser.add_argument('--number', type=int, default=None)
+    parser.add_argument('--repeat', type=int, default=None)
+    parser.add_argument('benchmarks', nargs='*',
+                        help='Only run these benchmarks: %s' %
+                        ', '.join(BENCHMARKS))
+    args = parser.parse_args(argv)
+
+    sweeps = QUICK_SWEEPS if args.quick else SWEEPS
+    number = args.number or (20 if args.quick else 100)
+    repeat = args.repeat or (3 if args.quick else 5)
+    results = run(sweeps, number, repeat, args.benchmarks)
+
+    document = OrderedDict([
+        ('meta', OrderedDict([
+            ('python', platform.python_version()),
+            ('django', django.get_version()),
+            ('implementation', platform.python_implementation()),
+        ])),
+        ('results', results),
+    ])
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2)
+    elif not args.compare:
+        json.dump(document, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            old_results = json.load(f)['results']
+        if compare(old_results, results, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1 +1,3 @@
 from .forms import MultiForm, MultiModelForm, InvalidArgument  # noqa
+from .formsets import (  # noqa
+    BaseMultiFormSet, BaseMultiModelFormSet, multiformset_factory)
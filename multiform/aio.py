@@ -0,0 +1,63 @@
+"""
+The coroutines behind MultiForm.afull_clean and MultiForm.ais_valid.
+They live in their own module because they need python 3.5+.
+"""
+import asyncio
+
+from .forms import call_closing_connections
+from .instrumentation import measure
+
+
+async def afull_clean_form(multiform, name):
+    """
+    Validate a single wrapped form without blocking the event loop.
+    If the form has its own ``afull_clean`` coroutine (like a MultiForm does),
+    it's awaited. Otherwise its ``full_clean`` is run in the multiform's
+    validation_executor (or the loop's default executor), which then closes
+    the database connections it opened.
+    """
+    form = multiform.forms[name]
+    if hasattr(form, 'afull_clean'):
+        if multiform.instrumentation is None:
+            await form.afull_clean()
+        else:
+            with measure(multiform.instrumentation, 'clean', name, type(form)):
+                await form.afull_clean()
+    else:
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(multiform.validation_executor,
+                                   call_closing_connections,
+                                   multiform._clean_wrapped_form, name)
+
+
+async def afull_clean(multiform):
+    multiform.clear_aggregate_cache()
+    if multiform.fail_fast:
+        # The wrapped forms are validated one after the other
+        for name in multiform.get_init_plan().validation_order:
+            if multiform.forms[name]._errors is None:
+                await afull_clean_form(multiform, name)
+            if multiform._fail_fast_check(name):
+                return
+        multiform._combine_clean_results()
+        return
+
+    names = [name for name, form in multiform.forms.items()
+             if form._errors is None]
+    results = await asyncio.gather(
+        *[afull_clean_form(multiform, name) for name in names],
+        return_exceptions=True)
+    # Like in the synchronous version, the exception of the first
+    # wrapped form (in the order of base_forms) is the one that's raised.
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    multiform._combine_clean_results()
+
+
+async def ais_valid(multiform):
+    if not multiform.is_bound:
+        return False
+    if multiform._errors is None:
+        await afull_clean(multiform)
+    return not multiform._errors
@@ -0,0 +1,219 @@
+"""
+Copy-on-write fields for the wrapped forms of a MultiForm.
+
+Normally, each form instance deep-copies all the fields of its class.
+With ``MultiForm.share_fields``, the wrapped forms are instances of a
+subclass of their class (see ``shared_fields_class``) whose ``fields``
+initially contain the class-level field objects. A field is only copied the
+first time it's accessed (with ``form.fields[name]``, ``get()``,
+``values()``, ``items()``, ``form[name]``,...) outside of django's own form
+machinery (cleaning the fields, rendering,...), that is when the form's
+``__init__``, its ``clean*()`` methods or a view may change it.
+
+Note that the ``__init__`` of django's ModelForm accesses all the fields by
+name (to apply ``limit_choices_to``) so they all get copied.
+"""
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+from contextlib import contextmanager
+import copy
+from functools import wraps
+
+
+class CopyOnWriteFields(OrderedDict):
+    """
+    The ``fields`` of a form that shares the field objects of its class
+    until they're accessed by name.
+    """
+    def __init__(self, shared_fields):
+        super(CopyOnWriteFields, self).__init__()
+        for name, field in shared_fields.items():
+            super(CopyOnWriteFields, self).__setitem__(name, field)
+        # The names of the fields that aren't shared anymore
+        self.copied = set()
+        self._reading = 0
+
+    def __getitem__(self, name):
+        field = super(CopyOnWriteFields, self).__getitem__(name)
+        if self._reading or name in self.copied:
+            return field
+        field = copy.deepcopy(field)
+        super(CopyOnWriteFields, self).__setitem__(name, field)
+        self.copied.add(name)
+        return field
+
+    def __setitem__(self, name, field):
+        super(CopyOnWriteFields, self).__setitem__(name, field)
+        self.copied.add(name)
+
+    # All the other ways of getting the fields go through __getitem__
+
+    def get(self, name, default=None):
+        if name in self:
+            return self[name]
+        return default
+
+    def setdefault(self, name, default=None):
+        if name not in self:
+            self[name] = default
+        return self[name]
+
+    def pop(self, name, *args):
+        if name in self:
+            self[name]  # copies the field
+        return super(CopyOnWriteFields, self).pop(name, *args)
+
+    def popitem(self, last=True):
+        if self:  # copy the field
+            self[next(reversed(self)) if last else next(iter(self))]
+        return super(CopyOnWriteFields, self).popitem(last)
+
+    def values(self):
+        return [self[name] for name in self]
+
+    def items(self):
+        return [(name, self[name]) for name in self]
+
+    def itervalues(self):  # Python 2
+        return iter(self.values())
+
+    def iteritems(self):  # Python 2
+        return iter(self.items())
+
+    def __deepcopy__(self, memo):
+        return OrderedDict((name, copy.deepcopy(self[name], memo))
+                           for name in self)
+
+    @contextmanager
+    def reading(self):
+        """
+        Accessing a field by name inside this block doesn't copy it.
+        """
+        self._reading += 1
+        try:
+            yield
+        finally:
+            self._reading -= 1
+
+    @contextmanager
+    def writing(self):
+        """
+        Accessing a field by name inside this block copies it again, even
+        inside a ``reading()`` block.
+        """
+        reading, self._reading = self._reading, 0
+        try:
+            yield
+        finally:
+            self._reading = reading
+
+
+class SharedBaseFields(OrderedDict):
+    """
+    The ``base_fields`` of a class whose instances share the field objects.
+    BaseForm.__init__ deep-copies them, which returns CopyOnWriteFields.
+    """
+    def __deepcopy__(self, memo):
+        return CopyOnWriteFields(self)
+
+
+@contextmanager
+def _fields_mode(form, mode):
+    context = getattr(form.fields, mode, None)
+    if context is None:  # the fields were replaced
+        yield
+    else:
+        with context():
+            yield
+
+
+def reading_fields(form):
+    return _fields_mode(form, 'reading')
+
+
+def writing_fields(form):
+    return _fields_mode(form, 'writing')
+
+
+def _writing_fields_method(method):
+    """
+    Wrap a method of the form's class (like ``clean_<name>``) that django's
+    machinery calls while it's reading the fields, so that it gets copies.
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with writing_fields(self):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class SharedFieldsMixin(object):
+    """
+    Run the methods of django's forms that only read the fields without
+    copying them.
+    The BoundFields (``form[name]``) and the ``clean*()`` methods, that can
+    be used to change the fields, still get copies.
+    """
+    def _clean_fields(self):
+        with reading_fields(self):
+            return super(SharedFieldsMixin, self)._clean_fields()
+
+    def _post_clean(self):
+        with reading_fields(self):
+            return super(SharedFieldsMixin, self)._post_clean()
+
+    def _html_output(self, *args, **kwargs):
+        try:
+            with reading_fields(self):
+                return super(SharedFieldsMixin, self)._html_output(
+                    *args, **kwargs)
+        finally:
+            # Don't hand out the BoundFields of the shared fields later
+            copied = getattr(self.fields, 'copied', None)
+            if copied is not None:
+                for name in list(self._bound_fields_cache):
+                    if name not in copied:
+                        del self._bound_fields_cache[name]
+
+    def _raw_value(self, fieldname):
+        with reading_fields(self):
+            return super(SharedFieldsMixin, self)._raw_value(fieldname)
+
+    @property
+    def changed_data(self):
+        with reading_fields(self):
+            return super(SharedFieldsMixin, self).changed_data
+
+    @property
+    def media(self):
+        with reading_fields(self):
+            return super(SharedFieldsMixin, self).media
+
+    def is_multipart(self):
+        with reading_fields(self):
+            return super(SharedFieldsMixin, self).is_multipart()
+
+
+_shared_fields_classes = {}
+
+
+def shared_fields_class(form_class):
+    """
+    Return a subclass of ``form_class`` whose instances share the field
+    objects of the class (created once per form class).
+    """
+    try:
+        return _shared_fields_classes[form_class]
+    except KeyError:
+        pass
+    attrs = {'__module__': form_class.__module__}
+    for attr in dir(form_class):
+        method = getattr(form_class, attr)
+        if attr.startswith('clean_') and callable(method):
+            attrs[attr] = _writing_fields_method(method)
+    new_class = type(form_class.__name__, (SharedFieldsMixin, form_class),
+                     attrs)
+    new_class.base_fields = SharedBaseFields(form_class.base_fields)
+    _shared_fields_classes[form_class] = new_class
+    return new_class
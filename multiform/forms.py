@@ -1,23 +1,391 @@
 from __future__ import unicode_literals
 
-from collections import defaultdict, OrderedDict
+from collections import defaultdict, namedtuple, OrderedDict
 from itertools import chain
-from functools import reduce
+from functools import partial, reduce, wraps
 
+import copy
+import datetime
+import decimal
+import hashlib
+import json
+import keyword
 import operator
+import re
+import uuid
+
+try:
+    from collections.abc import Mapping
+except ImportError:  # Python 2
+    from collections import Mapping
 
 from django.core.exceptions import ImproperlyConfigured
+try:
+    from django.core.exceptions import FieldDoesNotExist
+except ImportError:  # Django < 1.8
+    from django.db.models.fields import FieldDoesNotExist
+from django.db import connections, models, router, transaction
 from django.forms.forms import BaseForm
+from django.forms.models import BaseModelForm
 from django.forms.util import ErrorList
 from django.forms.widgets import Media
+from django.http import QueryDict
+from django.template.defaultfilters import filesizeformat
+from django.utils import six
+from django.utils.datastructures import MultiValueDict
+from django.utils.encoding import force_bytes, force_text
 from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
+
+try:
+    from django.core.cache import caches
+
+    def get_cache(alias):
+        return caches[alias]
+except ImportError:  # Django < 1.7
+    from django.core.cache import get_cache
+
+from .fields import shared_fields_class
+from .instrumentation import measure
+from .processes import apply_result, clean_form, marshal_form
+from .serialization import JSONEncoder
 
 
 class InvalidArgument:
     pass
 
 
-class MultiForm(BaseForm):
+IDENTIFIER_RE = re.compile(r'^[^\d\W]\w*$', re.UNICODE)
+# The TypeError of a binder when an argument is passed twice
+MULTIPLE_VALUES_RE = re.compile(
+    r"got multiple values for (?:keyword )?argument '(\w+)'")
+
+AggregateCacheInfo = namedtuple('AggregateCacheInfo', 'hits misses size')
+
+
+_missing = object()
+
+# The initial values that have a stable repr
+_RENDER_CACHE_SCALARS = six.string_types + six.integer_types + (
+    bytes, bool, float, decimal.Decimal, datetime.date, datetime.time,
+    datetime.timedelta, uuid.UUID, type(None))
+
+
+def call_closing_connections(func, *args):
+    """
+    Call ``func`` in a thread of a validation executor, then close the
+    database connections of that thread that are unusable or past their
+    CONN_MAX_AGE, like django does at the end of each request (which the
+    executor's threads never see).
+    Connections in a transaction are left alone, for executors that run the
+    tasks in the calling thread.
+    """
+    try:
+        return func(*args)
+    finally:
+        for connection in connections.all():
+            if not connection.in_atomic_block:
+                connection.close_if_unusable_or_obsolete()
+
+
+def render_cache_value(value):
+    """
+    Return a representation of an initial value that can go in a render
+    cache key: model instances are represented by their model and pk.
+    Raise ValueError for values that don't have one (callables, unsaved
+    instances, other objects,...).
+    """
+    if isinstance(value, _RENDER_CACHE_SCALARS):
+        return value
+    if isinstance(value, models.Model):
+        if value.pk is None:
+            raise ValueError("Unsaved instance %r" % value)
+        opts = value._meta
+        return ('model', opts.app_label, opts.model_name, value.pk)
+    if isinstance(value, Mapping):
+        # Sorted by repr since the keys can have different types
+        return ('dict', sorted(((render_cache_value(k), render_cache_value(v))
+                                for k, v in value.items()), key=repr))
+    if isinstance(value, (set, frozenset)):
+        return ('set', sorted((render_cache_value(v) for v in value),
+                              key=repr))
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__,
+                tuple(render_cache_value(v) for v in value))
+    raise ValueError("No render cache representation for %r" % value)
+
+
+def cached_aggregate(method):
+    """
+    Memoize the result of a MultiForm method (without arguments) that
+    combines all the wrapped forms.
+    The cache is cleared by MultiForm.clear_aggregate_cache.
+    Lists and dicts are returned as shallow copies, so that the caller can
+    change them without changing the next results (internal read-only uses
+    can pass ``_copy=False``).
+    """
+    key = method.__name__
+
+    @wraps(method)
+    def wrapper(self, _copy=True):
+        try:
+            value = self._aggregate_cache[key]
+        except KeyError:
+            self._aggregate_misses += 1
+            value = self._aggregate_cache[key] = method(self)
+        else:
+            self._aggregate_hits += 1
+        if _copy and isinstance(value, (list, dict)):
+            return copy.copy(value)
+        return value
+    return wrapper
+
+
+# The modules where django defines the media properties of forms
+# (the one based on the widgets and the one added for inner Media classes).
+DJANGO_MEDIA_MODULES = frozenset([BaseForm.media.fget.__module__,
+                                  Media.__module__])
+
+
+def has_dynamic_media(form_class):
+    """
+    Return whether the media of a form class can change from one instance to
+    the other, that is if the class (or one of its parents) defines its own
+    ``media`` property instead of the ones provided by django.
+    """
+    for klass in form_class.__mro__:
+        media = klass.__dict__.get('media')
+        if isinstance(media, property):
+            if media.fget.__module__ not in DJANGO_MEDIA_MODULES:
+                return True
+    return False
+
+
+def has_dynamic_base_forms(form_class):
+    """
+    Return whether a multiform class (or one of its parents) overrides
+    get_base_forms, so that each instance can wrap different forms.
+    """
+    for klass in form_class.__mro__:
+        if 'get_base_forms' in klass.__dict__:
+            return klass.__module__ != __name__
+    return False
+
+
+def match_prefix(key, prefixes):
+    """
+    Return the name that the given key of the data (or files) belongs to,
+    given a mapping of (prefix -> name), or None.
+    A key belongs to a prefix if it looks like "$prefix-*" (or
+    "initial-$prefix-*", for fields with show_hidden_initial).
+    If several prefixes match, the longest one wins.
+    """
+    candidates = [key]
+    if key.startswith('initial-'):
+        candidates.append(key[len('initial-'):])
+    match = None
+    for candidate in candidates:
+        i = candidate.find('-')
+        while i != -1:
+            match = prefixes.get(candidate[:i], match)
+            i = candidate.find('-', i + 1)
+    return match
+
+
+def partition_by_prefix(data, prefixes):
+    """
+    Split ``data`` (a dict, a MultiValueDict or a QueryDict) in a single pass,
+    given a mapping of (prefix -> name) (see match_prefix).
+    Return a dict (name -> slice of data with the same type as ``data``).
+    QueryDict slices are immutable.
+    """
+    keys = dict((name, []) for name in prefixes.values())
+    for key in data:
+        match = match_prefix(key, prefixes)
+        if match is not None:
+            keys[match].append(key)
+
+    slices = {}
+    for name, name_keys in keys.items():
+        if isinstance(data, QueryDict):
+            data_slice = QueryDict('', mutable=True, encoding=data.encoding)
+            for key in name_keys:
+                data_slice.setlist(key, data.getlist(key))
+            data_slice._mutable = False
+        elif isinstance(data, MultiValueDict):
+            data_slice = MultiValueDict(
+                [(key, data.getlist(key)) for key in name_keys])
+        else:
+            data_slice = dict((key, data[key]) for key in name_keys)
+        slices[name] = data_slice
+    return slices
+
+
+class NestedData(dict):
+    """
+    The data of a multiform given as one dict per wrapped form (name -> data
+    of the form, without prefixes), like a decoded JSON document.
+    See MultiForm.from_json.
+    """
+
+
+class InitPlan(object):
+    """
+    Everything about building the wrapped forms that only depends on the
+    multiform's class: the wrapped forms (in order), the set of their names,
+    the optional ones and the ``dispatch_init_*`` hooks that the class
+    implements.
+    It also holds the combined media of the wrapped forms once it's known
+    (with share_media, unless one of them has dynamic media).
+    """
+    dispatch_prefix = 'dispatch_init_'
+
+    def __init__(self, base_forms, dispatch_hooks, optional_forms=(),
+                 validation_order=()):
+        # dispatch_hooks maps each argument to the name of its hook
+        self.base_forms = tuple(base_forms.items())
+        self.order = tuple(base_forms)
+        self.names = frozenset(base_forms)
+        self.dispatch_hooks = dispatch_hooks
+        self.optional_forms = frozenset(optional_forms)
+        # All the names, starting with the ones of validation_order
+        self.validation_order = tuple(validation_order) + tuple(
+            name for name in base_forms if name not in validation_order)
+        self.dynamic_media = any(has_dynamic_media(form_class)
+                                 for form_class in base_forms.values())
+        self.media = None
+
+    @classmethod
+    def for_class(cls, form_class, base_forms=None):
+        """
+        Compile the plan for the given multiform class (and its base_forms,
+        unless other ones are given).
+        Return None if there aren't any base_forms.
+        """
+        if base_forms is None:
+            base_forms = getattr(form_class, 'base_forms', None)
+        if not base_forms:
+            return None
+
+        # The hooks are looked up on each instance, where they're bound
+        # whether they're methods, classmethods or staticmethods.
+        dispatch_hooks = {}
+        for attr in dir(form_class):
+            if attr.startswith(cls.dispatch_prefix):
+                if callable(getattr(form_class, attr)):
+                    dispatch_hooks[attr[len(cls.dispatch_prefix):]] = attr
+
+        base_forms = OrderedDict(base_forms)
+        names = {}
+        for attr in ['optional_forms', 'validation_order',
+                     'max_upload_sizes', 'process_forms']:
+            names[attr] = getattr(form_class, attr, None) or ()
+            unknown = set(names[attr]).difference(base_forms)
+            if unknown:
+                msg = "%s.%s contains unknown forms: %s"
+                raise ImproperlyConfigured(
+                    msg % (form_class, attr, ', '.join(sorted(unknown))))
+        # The size of a nested multiform's files is limited by its own class
+        nested = [name for name in names.pop('max_upload_sizes')
+                  if issubclass(base_forms[name], MultiForm)]
+        if nested:
+            msg = "%s.max_upload_sizes can't limit nested multiforms: %s"
+            raise ImproperlyConfigured(
+                msg % (form_class, ', '.join(sorted(nested))))
+        # Only the errors and cleaned_data come back from the process pool
+        unsupported = [name for name in names.pop('process_forms')
+                       if issubclass(base_forms[name], (MultiForm,
+                                                        BaseModelForm))]
+        if unsupported:
+            msg = ("%s.process_forms can't contain model forms or "
+                   "multiforms: %s")
+            raise ImproperlyConfigured(
+                msg % (form_class, ', '.join(sorted(unsupported))))
+        return cls(base_forms, dispatch_hooks, **names)
+
+
+class LazyFormDict(Mapping):
+    """
+    A mapping of the wrapped forms (name -> form) that instanciates each form
+    the first time it's accessed.
+    Iterating over the keys doesn't instanciate anything, but anything that
+    accesses the values (like ``values()`` or ``items()``) does.
+    """
+    def __init__(self, base_forms, build):
+        self._base_forms = OrderedDict(base_forms)
+        self._build = build
+        self._forms = {}
+
+    def __getitem__(self, name):
+        try:
+            return self._forms[name]
+        except KeyError:
+            form_class = self._base_forms[name]  # KeyError for unknown names
+            form = self._forms[name] = self._build(name, form_class)
+            return form
+
+    def __iter__(self):
+        return iter(self._base_forms)
+
+    def __len__(self):
+        return len(self._base_forms)
+
+    def __setitem__(self, name, form):
+        """
+        Replace the wrapped form with the given name (no new names can be
+        added).
+        """
+        if name not in self._base_forms:
+            raise KeyError(name)
+        self._forms[name] = form
+
+    def is_built(self, name):
+        """Return whether the wrapped form was instanciated already."""
+        return name in self._forms
+
+
+def compile_init_binder(signature):
+    """
+    Compile a function that takes the arguments of a multiform's __init__
+    and returns them split in two dicts: the ones in ``signature`` (a mapping
+    of name -> default value), with their defaults, and the extra keyword
+    arguments.
+    Letting python bind the arguments is a lot faster than doing it by hand
+    and it raises a TypeError for invalid arguments (reworded to name the
+    multiform's class by MultiForm._normalize_init_signature).
+    """
+    names = list(signature)
+    for name in names:
+        if (not IDENTIFIER_RE.match(name) or keyword.iskeyword(name) or
+                name == 'extra_kwargs'):
+            raise ImproperlyConfigured("Invalid argument name: %r" % name)
+    source = 'def __init__(%s):\n    return {%s}, extra_kwargs\n' % (
+        ', '.join(names + ['**extra_kwargs']),
+        ', '.join('%r: %s' % (str(name), name) for name in names))
+    namespace = {}
+    exec(source, namespace)
+    binder = namespace['__init__']
+    binder.__defaults__ = tuple(signature.values()) or None
+    return binder
+
+
+class MultiFormMetaclass(type):
+    """
+    Compile an InitPlan and a binder for the __init__ arguments when the
+    class is created so that instanciating a multiform only has to run them.
+    """
+    def __new__(mcs, name, bases, attrs):
+        new_class = super(MultiFormMetaclass, mcs).__new__(
+            mcs, name, bases, attrs)
+        if '_baseform_signature' in attrs:
+            new_class._init_binder = staticmethod(
+                compile_init_binder(new_class._baseform_signature))
+        new_class._init_plan = InitPlan.for_class(new_class)
+        new_class._dynamic_base_forms = has_dynamic_base_forms(new_class)
+        return new_class
+
+
+class MultiForm(six.with_metaclass(MultiFormMetaclass, BaseForm)):
     """
     A BaseForm subclass that can wrap several sub-forms into one entity.
     To use it, define a `base_forms` attribute which should be a mapping
@@ -26,7 +394,50 @@ class MultiForm(BaseForm):
     """
 
     base_fields = None  # Needed to bypass the absence of fancy metaclass
-    _baseform_signature = OrderedDict([  # TODO: signature objects (pep 362)
+    # When True, each wrapped form is only instanciated on first access
+    lazy_forms = False
+    # An executor (concurrent.futures.ThreadPoolExecutor for example) used to
+    # run the validation of the wrapped forms concurrently
+    validation_executor = None
+    # When True, each wrapped form only gets the part of data and files
+    # whose keys have its prefix
+    partition_data = False
+    # The names of the wrapped forms that are only bound (and validated)
+    # if some of the data or files have their prefix
+    optional_forms = ()
+    # When True, validation stops at the first invalid wrapped form.
+    # The wrapped forms are validated in the order of base_forms, except for
+    # the ones listed in validation_order that go first.
+    fail_fast = False
+    validation_order = None
+    # The names of the wrapped forms that fail_fast didn't validate
+    unvalidated_forms = ()
+    # The maximum size (in bytes) of all the files of a wrapped form
+    # (name -> size), also enforced while streaming by multiform.uploads
+    max_upload_sizes = {}
+    # The names of the wrapped forms that are cleaned in process_executor
+    # (a ProcessPoolExecutor) while the others are cleaned in this process
+    # (see multiform.processes)
+    process_executor = None
+    process_forms = ()
+    # When True, the combined media is computed once and shared by all the
+    # instances of the class. Only set it if the media of the wrapped forms
+    # don't depend on the instance (no widgets changed in __init__).
+    share_media = False
+    # When True, the wrapped forms share the field objects of their class
+    # and only copy the ones they change (see multiform.fields)
+    share_fields = False
+    # A collector that receives the timings of each wrapped form
+    # (see multiform.instrumentation)
+    instrumentation = None
+    # The alias of a cache (in settings.CACHES) that keeps the HTML of the
+    # unbound wrapped forms. Change render_cache_version to invalidate it.
+    render_cache = None
+    render_cache_timeout = None
+    render_cache_version = 1
+    # The signature of __init__ (compiled by the metaclass). The arguments
+    # that are not part of it are passed as-is to the wrapped forms.
+    _baseform_signature = OrderedDict([
         ('data', None),
         ('files', None),
         ('auto_id', 'id_%s'),
@@ -39,9 +450,44 @@ class MultiForm(BaseForm):
 
     def __init__(self, *args, **kwargs):
         sig_kwargs, extra_kwargs = self._normalize_init_signature(args, kwargs)
+        self._aggregate_hits = self._aggregate_misses = 0
         self._init_parent(**sig_kwargs)
         self._init_wrapped_forms(sig_kwargs, extra_kwargs)
 
+    # Changing the bound data invalidates the combined results
+    @property
+    def data(self):
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+        self.clear_aggregate_cache()
+
+    @property
+    def files(self):
+        return self._files
+
+    @files.setter
+    def files(self, value):
+        self._files = value
+        self.clear_aggregate_cache()
+
+    def clear_aggregate_cache(self):
+        """
+        Forget the memoized results of the methods combining all the wrapped
+        forms (changed_data, media, hidden_fields,...).
+        """
+        self._aggregate_cache = {}
+
+    def aggregate_cache_info(self):
+        """
+        Return the number of hits and misses of the aggregate cache,
+        as well as the number of results it currently holds.
+        """
+        return AggregateCacheInfo(self._aggregate_hits, self._aggregate_misses,
+                                  len(self._aggregate_cache))
+
     def _init_parent(self, **kwargs):
         super(MultiForm, self).__init__(**kwargs)
 
@@ -52,34 +498,28 @@ class MultiForm(BaseForm):
         Return two dictionaries: the normalized init arguments and another one
         with the extra ones (not part of the signature).
         """
-        if len(args) > len(self._baseform_signature):
-            msg = "%s.__init__ got too many positional arguments."
-            raise TypeError(msg % self.__class__)
-
-        normalized_kwargs = self._baseform_signature.copy()
-
-        for k, v in zip(self._baseform_signature, args):
-            if k in kwargs:
-                msg = "%s.__init__ got multiple values for argument '%s'"
-                raise TypeError(msg % (self.__class__, k))
-            normalized_kwargs[k] = v
-
-        for k in list(self._baseform_signature)[len(args):]:  # remaining ones
-            try:
-                normalized_kwargs[k] = kwargs.pop(k)
-            except KeyError:
-                pass
-
-        # at this point, ``kwargs`` only contain keys that are not
-        # in the form's signature
-        return normalized_kwargs, kwargs
+        try:
+            return self._init_binder(*args, **kwargs)
+        except TypeError as e:
+            # The binder's messages don't name the class
+            match = MULTIPLE_VALUES_RE.search(force_text(e))
+            if match is None:
+                msg = "%s.__init__ got too many positional arguments."
+                raise TypeError(msg % self.__class__)
+            msg = "%s.__init__ got multiple values for argument '%s'"
+            raise TypeError(msg % (self.__class__, match.group(1)))
 
     def _init_wrapped_forms(self, sig_kwargs, extra_kwargs):
         """
         Initialize the wrapped forms by passing the ones received in __init__
         and adding the keyword arguments whose names look like `$name__*`.
         """
-        base_forms = self.get_base_forms()
+        if self._dynamic_base_forms:
+            # The forms can change from one instance to the other so this
+            # instance gets its own plan.
+            self._init_plan = InitPlan.for_class(type(self),
+                                                 self.get_base_forms())
+        plan = self.get_init_plan()
         # We start by extracting all the keyword parameters that look like
         # "$name__*" where $name is the name of one of the wrapped form.
         # With this, we build a mapping of (name -> stripped_kwargs)
@@ -87,42 +527,182 @@ class MultiForm(BaseForm):
         dispatched_kwargs = defaultdict(dict)
         for k in list(extra_kwargs):  # Because we mutate it
             prefix, _, remainder = k.partition('__')
-            if remainder and prefix in base_forms:
+            if remainder and prefix in plan.names:
                 dispatched_kwargs[prefix][remainder] = extra_kwargs.pop(k)
 
         # Any extra_kwargs left at this point will be passed as-is to all
         # wrapped forms.
 
-        self.forms = OrderedDict()
-        for name, form_class in base_forms.items():
-            # We build each wrapped form one by one.
-            # Their keyword arguments are built in three steps, each with
-            # precedence over the next one:
-            # 1) For all the keywords that are part of the normal signature,
-            #    we check for the presence of a dispatch_init_$keyword method
-            #    on the instance.
-            #    If no such method is present, we just pass the value of the
-            #    argument as-is.
-            #    If such a method exists, then we use the result of calling
-            #    this method, passing the form's name and the original value.
-            # 2) For any existing ``extra_kwargs`` we check for the presence
-            #    of a dispatch_init_$keyword method on the instance.
-            #    If no such method is present, we just pass the value of the
-            #    argument as-is.
-            #    If such a method exists, then we use the result of calling
-            #    this method, passing the form's name and the original value.
-            # 3) If some dispatched_kwargs exist for this method (that is,
-            #    keyword arguments passed to the MultiForm's __init__ whose
-            #    name look like "$name__*"), then they are applied.
-            kwargs = {}
-            for k, v in chain(sig_kwargs.items(), extra_kwargs.items()):
-                if hasattr(self, 'dispatch_init_%s' % k):
-                    v = getattr(self, 'dispatch_init_%s' % k)(name, v)
-                    if v is InvalidArgument:
-                        continue
-                kwargs[k] = v
+        # The arguments without a dispatch_init_$keyword hook are the same
+        # for all wrapped forms so we only collect them once.
+        static_kwargs, hooked_kwargs = {}, []
+        for k, v in chain(sig_kwargs.items(), extra_kwargs.items()):
+            hook = plan.dispatch_hooks.get(k)
+            if hook is None:
+                static_kwargs[k] = v
+            else:
+                hooked_kwargs.append((k, v, getattr(self, hook)))
+
+        self._wrapped_kwargs = (static_kwargs, hooked_kwargs,
+                                dispatched_kwargs)
+        self._data_partitions = None
+        # name -> the fields whose files went over max_upload_sizes
+        self._rejected_uploads = {}
+        # name -> the wrapped form, if its HTML can go in the render cache
+        self._render_cacheable = {}
+        if self.is_bound and plan.optional_forms:
+            self.skipped_forms = frozenset(
+                name for name in plan.optional_forms
+                if not self.has_data(name))
+        else:
+            self.skipped_forms = frozenset()
+
+        if self.lazy_forms:
+            self.forms = LazyFormDict(plan.base_forms,
+                                      self._build_wrapped_form)
+        else:
+            self.forms = OrderedDict(
+                (name, self._build_wrapped_form(name, form_class))
+                for name, form_class in plan.base_forms)
+
+    def _get_wrapped_form_kwargs(self, name):
+        """
+        Return the keyword arguments used to instanciate the wrapped form
+        with the given name.
+        """
+        static_kwargs, hooked_kwargs, dispatched_kwargs = self._wrapped_kwargs
+        # Each wrapped form's keyword arguments are built in three steps,
+        # each with precedence over the next one:
+        # 1) For all the keywords that are part of the normal signature,
+        #    we check for the presence of a dispatch_init_$keyword method
+        #    on the instance.
+        #    If no such method is present, we just pass the value of the
+        #    argument as-is.
+        #    If such a method exists, then we use the result of calling
+        #    this method, passing the form's name and the original value.
+        # 2) For any existing ``extra_kwargs`` we check for the presence
+        #    of a dispatch_init_$keyword method on the instance.
+        #    If no such method is present, we just pass the value of the
+        #    argument as-is.
+        #    If such a method exists, then we use the result of calling
+        #    this method, passing the form's name and the original value.
+        # 3) If some dispatched_kwargs exist for this method (that is,
+        #    keyword arguments passed to the MultiForm's __init__ whose
+        #    name look like "$name__*"), then they are applied.
+        kwargs = static_kwargs.copy()
+        for k, v, hook in hooked_kwargs:
+            v = hook(name, v)
+            if v is InvalidArgument:
+                continue
+            kwargs[k] = v
+        if name in dispatched_kwargs:
             kwargs.update(dispatched_kwargs[name])
-            self.forms[name] = form_class(**kwargs)
+
+        # With nested data, the wrapped form gets its own part of the data,
+        # which isn't prefixed (unless something else was dispatched to it).
+        if self.is_bound and isinstance(self.data, NestedData):
+            data_slices, files_slices = self.get_data_partitions()
+            if kwargs.get('data') is self.data:
+                kwargs['data'] = data_slices[name]
+                kwargs['prefix'] = None
+
+        # With partition_data, the wrapped form only gets its slice of the
+        # multiform's data (unless something else was dispatched to it).
+        elif self.partition_data and self.is_bound:
+            data_slices, files_slices = self.get_data_partitions()
+            if kwargs.get('data') is self.data:
+                kwargs['data'] = data_slices[name]
+            if kwargs.get('files') is self.files:
+                kwargs['files'] = files_slices[name]
+
+        # Optional wrapped forms that didn't receive any data are left unbound
+        if name in self.skipped_forms:
+            kwargs['data'] = kwargs['files'] = None
+        return kwargs
+
+    def _get_wrapped_form_prefix(self, name):
+        """
+        Return the prefix that the wrapped form with the given name gets,
+        without building the rest of its keyword arguments.
+        """
+        static_kwargs, hooked_kwargs, dispatched_kwargs = self._wrapped_kwargs
+        if 'prefix' in dispatched_kwargs.get(name, ()):
+            return dispatched_kwargs[name]['prefix']
+        for k, v, hook in hooked_kwargs:
+            if k == 'prefix':
+                v = hook(name, v)
+                return None if v is InvalidArgument else v
+        return static_kwargs.get('prefix')
+
+    def get_wrapped_form_prefixes(self):
+        """
+        Return an OrderedDict of the prefixes of the wrapped forms
+        (name -> prefix), without building them.
+        """
+        return OrderedDict((name, self._get_wrapped_form_prefix(name))
+                           for name in self.get_init_plan().order)
+
+    def get_data_partitions(self):
+        """
+        Split the multiform's data and files by the prefixes of the wrapped
+        forms (in a single pass over each of them).
+        Return two dicts (name -> read-only slice of data or files).
+        A wrapped form without a prefix gets the whole data and files.
+        With NestedData, each wrapped form gets its own part of the data (an
+        empty dict if it's missing or isn't a dict) and all the files.
+        """
+        if self._data_partitions is None and isinstance(self.data,
+                                                        NestedData):
+            data_slices, files_slices = {}, {}
+            for name, form_class in self.get_init_plan().base_forms:
+                part = self.data.get(name)
+                if not isinstance(part, dict):
+                    part = {}
+                if issubclass(form_class, MultiForm):
+                    part = NestedData(part)
+                data_slices[name] = part
+                files_slices[name] = self.files
+            self._data_partitions = data_slices, files_slices
+        elif self._data_partitions is None:
+            prefixes, unprefixed = {}, []
+            for name, form_class in self.get_init_plan().base_forms:
+                prefix = self._get_wrapped_form_prefix(name)
+                if prefix:
+                    prefixes[prefix] = name
+                else:
+                    unprefixed.append(name)
+            data_slices = partition_by_prefix(self.data, prefixes)
+            files_slices = partition_by_prefix(self.files, prefixes)
+            for name in unprefixed:
+                data_slices[name] = self.data
+                files_slices[name] = self.files
+            self._data_partitions = data_slices, files_slices
+        return self._data_partitions
+
+    def has_data(self, name):
+        """
+        Return whether any of the keys in data or files belong to the
+        wrapped form with the given name.
+        """
+        data_slices, files_slices = self.get_data_partitions()
+        return bool(data_slices[name] or files_slices[name])
+
+    def _build_wrapped_form(self, name, form_class, kwargs=None):
+        if kwargs is None:
+            kwargs = self._get_wrapped_form_kwargs(name)
+        if self.share_fields:
+            form_class = shared_fields_class(form_class)
+        if self.instrumentation is None:
+            form = form_class(**kwargs)
+        else:
+            with measure(self.instrumentation, 'init', name, form_class):
+                form = form_class(**kwargs)
+        if name in self.skipped_forms:
+            # Like an empty_permitted form that has no changes
+            form.cleaned_data = {}
+        if self.render_cache is not None:
+            self._check_render_cacheable(name, form, kwargs)
+        return form
 
     def dispatch_init_prefix(self, name, prefix):
         """
@@ -132,38 +712,58 @@ class MultiForm(BaseForm):
         # so self.add_prefix works.
         return self.add_prefix(name)
 
-    def get_base_forms(self):
+    def get_init_plan(self):
         """
-        Return a mapping of the forms that this multiform wraps (name -> form).
+        Return the InitPlan compiled for this class by the metaclass.
         """
-        if not getattr(self, 'base_forms', None):
+        if self._init_plan is None:
             error_message_fmt = "%s does not define a base_forms attribute."
             raise ImproperlyConfigured(error_message_fmt % self.__class__)
+        return self._init_plan
 
+    def get_base_forms(self):
+        """
+        Return a mapping of the forms that this multiform wraps (name -> form).
+        Subclasses can override it to wrap different forms for each instance.
+        """
+        # The class' plan (this instance's one is based on this method)
+        plan = type(self)._init_plan or self.get_init_plan()
         # Incidentally, this also makes a shallow copy
-        return OrderedDict(self.base_forms)
+        return OrderedDict(plan.base_forms)
 
     def _combine(self, attr, filter=False,
                  call=False, call_args=(), call_kwargs=None,
-                 ignore_missing=False):
+                 ignore_missing=False, exclude=(), instrument=None):
         """
         Combine an attribute (or method) of each wrapped form into an
         OrderedDict.
         To remove empty vales from the dict, pass ``filer=False``.
         To call a method, pass ``call=True`` (passing ``call_args`` and
         ``call_kwargs`` if needed).
+        To leave out some wrapped forms, pass their names in ``exclude``.
+        To send the timing of each call to the instrumentation collector,
+        pass the name of the phase in ``instrument``.
         """
-        if not call_kwargs:
-            call_kwargs = {}
+        collector = self.instrumentation if instrument else None
         d = OrderedDict()
         for name, form in self.forms.items():
-            if ignore_missing and not hasattr(form, attr):
+            if name in exclude:
+                continue
+            v = getattr(form, attr, _missing)
+            if v is _missing:
+                if not ignore_missing:
+                    getattr(form, attr)  # raise the AttributeError
                 if not filter:
                     d[name] = None
                 continue
-            v = getattr(form, attr)
             if call:
-                v = v(*call_args, **call_kwargs)
+                if collector is None:
+                    v = v(*call_args, **call_kwargs) if call_kwargs \
+                        else v(*call_args)
+                else:
+                    with measure(collector, instrument, name, type(form)):
+                        v = v(*call_args, **call_kwargs) if call_kwargs \
+                            else v(*call_args)
             if not filter or v:
                 d[name] = v
         return d
@@ -189,16 +789,394 @@ class MultiForm(BaseForm):
     def __getitem__(self, name):
         return self.forms[name]
 
+    @cached_aggregate
+    def field_index(self):
+        """
+        Return a dict that maps the prefixed (HTML) name of every field of
+        the wrapped forms to a tuple: (name of the wrapped form, name of the
+        field in that form). For a wrapped MultiForm, the second item is the
+        prefixed name in that multiform.
+        """
+        index = {}
+        for name, form in self.forms.items():
+            if hasattr(form, 'field_index'):
+                for html_name in form.field_index():
+                    index[html_name] = (name, html_name)
+            else:
+                for field_name in form.fields:
+                    index[form.add_prefix(field_name)] = (name, field_name)
+        return index
+
+    def get_bound_field(self, html_name):
+        """
+        Return the BoundField with the given prefixed name (``foo-bar`` for
+        the field ``bar`` of the wrapped form ``foo`` for example).
+        Raise KeyError if there's no such field.
+        """
+        name, key = self.field_index(_copy=False)[html_name]
+        form = self.forms[name]
+        if hasattr(form, 'get_bound_field'):
+            return form.get_bound_field(key)
+        return form[key]
+
+    def get_field_errors(self, html_name):
+        """
+        Return the errors of the field with the given prefixed name (this
+        validates the multiform if needed).
+        Raise KeyError if there's no such field.
+        """
+        name, key = self.field_index(_copy=False)[html_name]
+        form = self.forms[name]
+        if hasattr(form, 'get_field_errors'):
+            return form.get_field_errors(key)
+        return form.errors.get(key, form.error_class())
+
+    @property
+    @cached_aggregate
+    def prefixed_errors(self):
+        """
+        The errors of the wrapped forms (validating the multiform if needed)
+        as a flat OrderedDict (prefixed name -> list of messages).
+        Non-field errors use the wrapped form's prefix and ``__all__``.
+        The values are plain lists of strings, ready for JSON.
+        """
+        flat = OrderedDict()
+        for name, errors in self.errors.items():
+            form = self.forms[name]
+            if hasattr(form, 'prefixed_errors'):
+                flat.update(form.prefixed_errors)
+            else:
+                for field_name, field_errors in errors.items():
+                    flat[form.add_prefix(field_name)] = [
+                        force_text(error) for error in field_errors]
+        return flat
+
+    @classmethod
+    def from_json(cls, document, **kwargs):
+        """
+        Return a bound multiform for a JSON document (or the dict it decodes
+        to) with an object for each wrapped form, holding its data without
+        prefixes. Other keyword arguments are passed to the multiform.
+        Like a part that isn't an object, a document that isn't an object is
+        treated as an empty one (so the required fields get errors). A
+        document that isn't valid JSON raises a ValueError.
+        """
+        if isinstance(document, bytes):
+            document = document.decode('utf-8')
+        if isinstance(document, six.string_types):
+            document = json.loads(document)
+        if not isinstance(document, dict):
+            document = {}
+        return cls(NestedData(document), **kwargs)
+
+    def json_errors(self):
+        """
+        Return the errors of the wrapped forms (validating the multiform if
+        needed) as nested dicts (name -> field name -> list of messages).
+        The messages are plain strings, without any HTML rendering.
+        """
+        result = OrderedDict()
+        for name, errors in self.errors.items():
+            form = self.forms[name]
+            if hasattr(form, 'json_errors'):
+                result[name] = form.json_errors()
+            else:
+                result[name] = dict(
+                    (field_name, [force_text(error) for error in field_errors])
+                    for field_name, field_errors in errors.items())
+        return result
+
+    def get_json_payload(self):
+        """
+        Validate the multiform and return the result as a dict that can be
+        encoded to JSON: ``valid`` and either ``cleaned_data`` or ``errors``
+        (and ``unvalidated_forms`` with fail_fast).
+        """
+        payload = OrderedDict([('valid', self.is_valid())])
+        if payload['valid']:
+            payload['cleaned_data'] = self.cleaned_data
+        else:
+            payload['errors'] = self.json_errors()
+            if self.unvalidated_forms:
+                payload['unvalidated_forms'] = list(self.unvalidated_forms)
+        return payload
+
+    def iter_json(self, cls=JSONEncoder):
+        """
+        Validate the multiform and yield the JSON encoding of
+        get_json_payload() in chunks, as they are produced (for a
+        StreamingHttpResponse for example).
+        """
+        encoder = cls(separators=(',', ':'))
+        return encoder.iterencode(self.get_json_payload())
+
     def _html_output(self, *args, **kwargs):
-        rendered = self._combine_values('_html_output', call=True, filter=True,
-                                        call_args=args, call_kwargs=kwargs)
-        return mark_safe('\n'.join(rendered))
+        rendered = self._iter_rendered('_html_output', args, kwargs)
+        return mark_safe(''.join(rendered))
+
+    def _iter_rendered(self, method, args=(), kwargs=None):
+        """
+        Render the wrapped forms one by one with their ``method`` and yield
+        the non-empty results (separated by newlines).
+        """
+        kwargs = kwargs or {}
+        collector = self.instrumentation
+        separator = ''
+        for name, form in self.forms.items():
+            if collector is None:
+                html = self._render_wrapped_form(name, form, method, args,
+                                                 kwargs)
+            else:
+                with measure(collector, 'render', name, type(form)):
+                    html = self._render_wrapped_form(name, form, method,
+                                                     args, kwargs)
+            if html:
+                if separator:
+                    yield separator
+                yield html
+                separator = '\n'
+
+    def _render_wrapped_form(self, name, form, method, args, kwargs):
+        """
+        Call the given rendering method of a wrapped form, going through
+        the render cache for unbound forms.
+        """
+        render = getattr(form, method)
+        if not self._can_cache_render(name, form):
+            return render(*args, **kwargs)
+        key = self.get_render_cache_key(form, method, args, kwargs)
+        if key is None:
+            return render(*args, **kwargs)
+        cache = get_cache(self.render_cache)
+        html = cache.get(key)
+        if html is None:
+            html = render(*args, **kwargs)
+            if self.render_cache_timeout is None:
+                cache.set(key, html)
+            else:
+                cache.set(key, html, self.render_cache_timeout)
+        return mark_safe(html)
+
+    def _can_cache_render(self, name, form):
+        """
+        Return whether the HTML of the wrapped form with the given name can
+        go through the render cache: it has to be an unbound plain form
+        (nested multiforms use their own cache) whose other arguments than
+        the ones of MultiForm's signature are all None.
+        """
+        if (self.render_cache is None or form.is_bound or
+                not isinstance(form, BaseForm) or isinstance(form, MultiForm)):
+            return False
+        # Checked by _build_wrapped_form (a form that replaced the one it
+        # built isn't cached)
+        return self._render_cacheable.get(name) is form
+
+    def _check_render_cacheable(self, name, form, kwargs):
+        """
+        Remember whether the wrapped form was built without arguments that
+        aren't part of the render cache key.
+        """
+        # Other arguments (like a user whose choices are loaded in
+        # __init__) can change the HTML but they aren't part of the key.
+        signature = MultiForm._baseform_signature
+        if all(v is None for k, v in kwargs.items() if k not in signature):
+            self._render_cacheable[name] = form
+        else:
+            self._render_cacheable.pop(name, None)
+
+    def get_render_cache_key(self, form, method, args, kwargs):
+        """
+        Return the render cache key of a wrapped form: the HTML of an unbound
+        form only depends on its class, prefix, auto_id and initial (and on
+        the active language).
+        Return None to bypass the cache, when the initial data has values
+        that ``render_cache_value`` can't represent.
+        """
+        try:
+            initial = render_cache_value(dict(form.initial or {}))
+        except ValueError:
+            return None
+        form_class = type(form)
+        parts = (
+            '%s.%s' % (form_class.__module__, form_class.__name__),
+            self.render_cache_version,
+            get_language(),
+            method, args, sorted(kwargs.items()),
+            form.prefix, form.auto_id, getattr(form, 'label_suffix', None),
+            initial,
+        )
+        digest = hashlib.md5(force_bytes(repr(parts))).hexdigest()
+        return 'multiform.render.%s' % digest
+
+    def iter_html(self, method='as_table'):
+        """
+        Render the wrapped forms using their ``method`` (as_table, as_ul,...)
+        and yield the HTML fragments as they are produced.
+        Joined together, they are the same as calling ``method`` on the
+        multiform, but they can be streamed (with StreamingHttpResponse).
+        """
+        return self._iter_rendered(method)
 
+    def iter_as_table(self):
+        return self.iter_html('as_table')
+
+    def iter_as_ul(self):
+        return self.iter_html('as_ul')
+
+    def iter_as_p(self):
+        return self.iter_html('as_p')
+
+    @cached_aggregate
     def non_field_errors(self):
         return self._combine('non_field_errors', call=True, filter=True)
 
     def full_clean(self):
-        # This will call full_clean on all sub-forms
+        self.clear_aggregate_cache()
+        if self.fail_fast:
+            for name in self.get_init_plan().validation_order:
+                if self._fail_fast_check(name):
+                    return
+            self._combine_clean_results()
+            return
+        # The process_forms are sent to the process pool first so that the
+        # other wrapped forms are cleaned in the meantime
+        futures = OrderedDict(
+            (name, self._submit_to_process_pool(name))
+            for name, form in self.forms.items()
+            if form._errors is None and self._cleans_in_process(name))
+        if self.validation_executor is not None:
+            self._full_clean_concurrently(self.validation_executor,
+                                          exclude=futures)
+        elif (self.instrumentation is not None or self.max_upload_sizes or
+                futures):
+            # Otherwise the wrapped forms are cleaned by _combine
+            for name, form in self.forms.items():
+                if form._errors is None and name not in futures:
+                    self._clean_wrapped_form(name)
+        for name, future in futures.items():
+            self._clean_wrapped_form(name, future)
+        self._combine_clean_results()
+
+    def _clean_wrapped_form(self, name, future=None):
+        """
+        Run full_clean on the wrapped form with the given name (in the
+        process pool for process_forms). If a future from the process pool
+        is given, wait for its result instead.
+        """
+        form = self.forms[name]
+        if future is None and self._cleans_in_process(name):
+            future = self._submit_to_process_pool(name)
+        elif future is None:
+            self._reject_oversized_uploads(name)
+        if self.instrumentation is None:
+            self._run_full_clean(form, future)
+        else:
+            with measure(self.instrumentation, 'clean', name, type(form)):
+                self._run_full_clean(form, future)
+        if self._rejected_uploads.get(name):
+            self._add_upload_size_errors(name)
+
+    @staticmethod
+    def _run_full_clean(form, future=None):
+        if future is None:
+            form.full_clean()
+        else:
+            apply_result(form, future.result())
+
+    def _cleans_in_process(self, name):
+        """
+        Return whether the wrapped form with the given name is cleaned in
+        the process pool.
+        """
+        return (self.process_executor is not None and
+                name in self.process_forms and self.forms[name].is_bound)
+
+    def _submit_to_process_pool(self, name):
+        """
+        Send the wrapped form with the given name to the process pool to
+        be built again and cleaned there. Return the future of the result.
+        """
+        self._reject_oversized_uploads(name)
+        form = self.forms[name]
+        form_class = OrderedDict(self.get_init_plan().base_forms)[name]
+        kwargs = self._get_wrapped_form_kwargs(name)
+        # The form may have been rebound with revalidate
+        kwargs['data'], kwargs['files'] = form.data, form.files
+        return self.process_executor.submit(
+            clean_form, marshal_form(form_class, kwargs))
+
+    def _reject_oversized_uploads(self, name):
+        """
+        If the files of the wrapped form with the given name are bigger than
+        its max_upload_sizes in total, remove them from the form's files
+        before it's cleaned, so that its fields (and validators) see them as
+        missing instead of reading them (a RejectedUpload has no content).
+        """
+        self._rejected_uploads.pop(name, None)
+        if name not in self.max_upload_sizes:
+            return
+        form = self.forms[name]
+        if not form.files:
+            return
+        uploads = OrderedDict()
+        for field_name in form.fields:
+            key = form.add_prefix(field_name)
+            if hasattr(form.files, 'getlist'):
+                files = form.files.getlist(key)
+            else:
+                files = [form.files[key]] if key in form.files else []
+            files = [f for f in files if getattr(f, 'size', None)]
+            if files:
+                uploads[key] = (field_name, files)
+        total = sum(f.size for field_name, files in uploads.values()
+                    for f in files)
+        if total <= self.max_upload_sizes[name]:
+            return
+        # The files can be shared with the other wrapped forms
+        if hasattr(form.files, 'lists'):
+            form.files = MultiValueDict([
+                (key, files) for key, files in form.files.lists()
+                if key not in uploads])
+        else:
+            form.files = dict((key, f) for key, f in form.files.items()
+                              if key not in uploads)
+        self._rejected_uploads[name] = [field_name for field_name, files
+                                        in uploads.values()]
+
+    def _add_upload_size_errors(self, name):
+        """
+        Replace the errors of the fields whose files were rejected by
+        _reject_oversized_uploads (like "This field is required.") with
+        the error about max_upload_sizes.
+        """
+        form = self.forms[name]
+        message = ("The files of this form can't be bigger than %s "
+                   "in total." % filesizeformat(self.max_upload_sizes[name]))
+        for field_name in self._rejected_uploads[name]:
+            form._errors[field_name] = form.error_class([message])
+            if hasattr(form, 'cleaned_data'):
+                form.cleaned_data.pop(field_name, None)
+
+    def _fail_fast_check(self, name):
+        """
+        Check (and validate if needed) the wrapped form with the given name
+        for fail_fast. If it's invalid, populate the multiform's errors with
+        its errors, record the wrapped forms that come after it in
+        unvalidated_forms and return True.
+        """
+        if self.forms[name]._errors is None:
+            self._clean_wrapped_form(name)
+        errors = self.forms[name].errors
+        if not errors:
+            return False
+        self._errors = OrderedDict([(name, errors)])
+        order = self.get_init_plan().validation_order
+        self.unvalidated_forms = order[order.index(name) + 1:]
+        return True
+
+    def _combine_clean_results(self):
+        self.unvalidated_forms = ()
+        # This will call full_clean on all sub-forms that weren't cleaned yet
         # (and populate their _errors attribute):
         self._errors = self._combine('errors', filter=True)
 
@@ -206,24 +1184,233 @@ class MultiForm(BaseForm):
             # Each sub-form's cleaned_data is now populated
             self.cleaned_data = self._combine('cleaned_data')
 
+    def revalidate(self, name, data, files=None):
+        """
+        Rebind the wrapped form with the given name to new data (and files)
+        and validate it, without revalidating the other wrapped forms.
+        ``data`` and ``files`` look like what the multiform itself receives
+        (with prefixed keys). The multiform's errors and cleaned_data are
+        updated and the new wrapped form is returned.
+        """
+        if not self.is_bound:
+            raise ValueError("Only a bound multiform can be revalidated.")
+        plan = self.get_init_plan()
+        form_class = OrderedDict(plan.base_forms)[name]  # KeyError if unknown
+        if files is None:
+            files = {}
+
+        prefix = self._get_wrapped_form_prefix(name)
+        if prefix:
+            data_slice = partition_by_prefix(data, {prefix: name})[name]
+            files_slice = partition_by_prefix(files, {prefix: name})[name]
+        else:
+            data_slice, files_slice = data, files
+        if name in plan.optional_forms:
+            if data_slice or files_slice:
+                self.skipped_forms = self.skipped_forms - set([name])
+            else:
+                self.skipped_forms = self.skipped_forms | set([name])
+
+        kwargs = self._get_wrapped_form_kwargs(name)
+        if self._data_partitions is not None:
+            self._data_partitions[0][name] = data_slice
+            self._data_partitions[1][name] = files_slice
+        if name not in self.skipped_forms:
+            if self.partition_data:
+                kwargs['data'], kwargs['files'] = data_slice, files_slice
+            else:
+                kwargs['data'], kwargs['files'] = data, files
+        form = self._build_wrapped_form(name, form_class, kwargs)
+        self.forms[name] = form
+
+        # The other wrapped forms keep their (cached) errors so full_clean
+        # only validates the new one before combining the results again.
+        self.__dict__.pop('cleaned_data', None)
+        self.full_clean()
+        return form
+
+    def afull_clean(self):
+        """
+        Coroutine version of full_clean that validates all the wrapped forms
+        concurrently (requires python 3.5+).
+        """
+        from .aio import afull_clean
+        return afull_clean(self)
+
+    def ais_valid(self):
+        """
+        Coroutine version of is_valid (requires python 3.5+).
+        """
+        from .aio import ais_valid
+        return ais_valid(self)
+
+    def _full_clean_concurrently(self, executor, exclude=()):
+        """
+        Run full_clean on the wrapped forms that weren't validated yet using
+        the given executor and wait for all of them to finish.
+        Exceptions are re-raised in the order of the wrapped forms.
+        The database connections opened by the tasks are closed after them.
+        """
+        futures = [executor.submit(call_closing_connections,
+                                   self._clean_wrapped_form, name)
+                   for name, form in self.forms.items()
+                   if form._errors is None and name not in exclude]
+        for future in futures:
+            future.result()
+
     @property
+    @cached_aggregate
     def changed_data(self):
         return self._combine('changed_data', filter=True)
 
     @property
+    @cached_aggregate
     def media(self):
+        # With share_media (and unless a wrapped form has its own media
+        # property), the result is only combined once for the class.
+        plan = self.get_init_plan()
+        if not self.share_media or plan.dynamic_media:
+            return self._combine_media()
+        if plan.media is None:
+            plan.media = self._combine_media()
+        return plan.media
+
+    def _combine_media(self):
         return reduce(operator.add, self._combine_values('media'), Media())
 
+    @cached_aggregate
     def is_multipart(self):
         return any(self._combine_values('is_multipart', call=True))
 
+    @cached_aggregate
     def hidden_fields(self):
         return list(self._combine_chain('hidden_fields', call=True))
 
+    @cached_aggregate
     def visible_fields(self):
         return list(self._combine_chain('visible_fields', call=True))
 
 
+def related_model(field):
+    """
+    Return the model targeted by a relation field.
+    """
+    return getattr(field, 'related_model', None) or field.rel.to
+
+
+def is_foreign_key(model, name):
+    """
+    Return whether the given model has a foreign key (or one-to-one field)
+    with the given name.
+    """
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return False
+    return isinstance(field, models.ForeignKey)
+
+
+def can_return_pks_from_bulk_insert(model):
+    """
+    Return whether bulk_create sets the primary keys of the created
+    instances on the database used for the given model.
+    """
+    features = connections[router.db_for_write(model)].features
+    return (getattr(features, 'can_return_rows_from_bulk_insert', False) or
+            getattr(features, 'can_return_ids_from_bulk_insert', False))
+
+
+def save_in_bulk(instances, needs_pk=False):
+    """
+    Save a list of instances of the same model, using one bulk_create for
+    the new ones when possible.
+    If ``needs_pk`` is True, the new instances are only created in bulk if the
+    database sets their primary key.
+    """
+    new = [instance for instance in instances if instance.pk is None]
+    existing = [instance for instance in instances if instance.pk is not None]
+    if new:
+        model = type(new[0])
+        if model._meta.many_to_many:
+            needs_pk = True  # for saving the many-to-many data
+        if model._meta.parents or (
+                needs_pk and not can_return_pks_from_bulk_insert(model)):
+            existing = instances
+        else:
+            model._default_manager.bulk_create(new)
+    for instance in existing:
+        instance.save()
+
+
+class SavePlan(object):
+    """
+    The order in which a MultiModelForm saves the instances of its wrapped
+    forms (parents first) and the foreign keys that link them together.
+    """
+    def __init__(self, order, links, nested=frozenset()):
+        self.order = order
+        # name -> list of (foreign key, name of the parent wrapped form)
+        self.links = links
+        # The wrapped MultiModelForms, which save their own instances
+        self.nested = frozenset(nested)
+        # The wrapped forms whose instances other instances point to
+        self.parents = frozenset(parent for name_links in links.values()
+                                 for _, parent in name_links)
+
+    @classmethod
+    def for_base_forms(cls, base_forms):
+        form_models = OrderedDict()
+        nested = []
+        for name, form_class in base_forms:
+            meta = getattr(form_class, '_meta', None)
+            form_models[name] = getattr(meta, 'model', None)
+            if issubclass(form_class, MultiModelForm):
+                nested.append(name)
+
+        # A foreign key is only filled in automatically if exactly one other
+        # wrapped form has an instance it could point to.
+        links = {}
+        for name, model in form_models.items():
+            links[name] = []
+            if model is None:
+                continue
+            for field in model._meta.fields:
+                if not isinstance(field, models.ForeignKey):
+                    continue
+                target = related_model(field)
+                parents = [other for other, other_model in form_models.items()
+                           if other != name and other_model is not None
+                           and issubclass(other_model, target)]
+                if len(parents) == 1:
+                    links[name].append((field, parents[0]))
+
+        # Topological sort that keeps the order of base_forms when possible
+        order, remaining = [], list(form_models)
+        while remaining:
+            for name in remaining:
+                if all(parent in order for _, parent in links[name]):
+                    break
+            else:
+                msg = "Circular foreign keys between the wrapped forms: %s"
+                raise ImproperlyConfigured(msg % ', '.join(remaining))
+            order.append(name)
+            remaining.remove(name)
+
+        return cls(tuple(order), links, nested)
+
+    def link(self, name, instances):
+        """
+        Fill in the empty foreign keys of ``instances[name]`` with the
+        instances of the wrapped forms they point to.
+        """
+        instance = instances[name]
+        for field, parent in self.links[name]:
+            if getattr(instance, field.attname) is not None:
+                continue
+            if parent in instances:
+                setattr(instance, field.name, instances[parent])
+
+
 class MultiModelForm(MultiForm):
     """
     A MultiForm that supports a ModelForm's signature.
@@ -232,6 +1419,12 @@ class MultiModelForm(MultiForm):
     _baseform_signature = OrderedDict(
         list(MultiForm._baseform_signature.items()) + [('instance', None)])
 
+    # The lookups that prepare_queryset applies so that the wrapped forms'
+    # instances are fetched along with the objects passed as instance.
+    # None means the wrapped forms whose name is a foreign key of the model.
+    select_related = None
+    prefetch_related = ()
+
     def _init_parent(self, **kwargs):
         del kwargs['instance']
         super(MultiForm, self).__init__(**kwargs)
@@ -241,16 +1434,209 @@ class MultiModelForm(MultiForm):
             return None
         return getattr(instance, name)
 
+    @classmethod
+    def prepare_queryset(cls, queryset):
+        """
+        Return the given queryset (of objects to pass as ``instance``) with
+        the select_related and prefetch_related lookups that the wrapped forms
+        need to get their instance without extra queries.
+        The default select_related comes from the class' base_forms (not from
+        get_base_forms, which needs an instance).
+        """
+        select_related = cls.select_related
+        if select_related is None:
+            if cls._init_plan is None:
+                error_message_fmt = ("%s does not define a base_forms "
+                                     "attribute, so its select_related "
+                                     "attribute has to be set to use "
+                                     "prepare_queryset.")
+                raise ImproperlyConfigured(error_message_fmt % cls)
+            select_related = [name for name, form_class in
+                              cls._init_plan.base_forms
+                              if is_foreign_key(queryset.model, name)]
+        # select_related() without arguments would follow all foreign keys
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if cls.prefetch_related:
+            queryset = queryset.prefetch_related(*cls.prefetch_related)
+        return queryset
+
+    @classmethod
+    def for_queryset(cls, queryset, **kwargs):
+        """
+        Return a list with a multiform for each object of the given queryset
+        (passed as ``instance``), fetched with prepare_queryset.
+        Other keyword arguments are passed to each multiform.
+        """
+        return [cls(instance=instance, **kwargs)
+                for instance in cls.prepare_queryset(queryset)]
+
+    @classmethod
+    def get_save_plan(cls):
+        """
+        Return the SavePlan of the class (computed on first use).
+        """
+        if '_save_plan' not in cls.__dict__:
+            if cls._init_plan is None:
+                error_message_fmt = ("%s does not define a base_forms "
+                                     "attribute, so only its instances have "
+                                     "a save plan.")
+                raise ImproperlyConfigured(error_message_fmt % cls)
+            cls._save_plan = SavePlan.for_base_forms(cls._init_plan.base_forms)
+        return cls._save_plan
+
+    def get_instance_save_plan(self):
+        """
+        Return the SavePlan of this instance: the class' one, unless
+        get_base_forms is overridden.
+        """
+        if self._dynamic_base_forms:
+            return SavePlan.for_base_forms(self.get_init_plan().base_forms)
+        return self.get_save_plan()
+
     def save(self, commit=True):
-        # TODO: Find a good API to wrap this in a db transaction
-        # TODO: allow committing some forms but not others
+        """
+        Save the instances of all the wrapped forms in one transaction.
+        They are saved in the order of their foreign keys (parents first)
+        and the foreign keys between them are filled in when empty.
+        The many-to-many data of all forms is saved at the end.
+        ``commit`` can also be a collection of names of wrapped forms: only
+        their instances (and many-to-many data) are saved then, the other
+        ones are returned unsaved, like with ``commit=False``.
+        """
+        if commit is True or not commit:
+            names = None
+        else:
+            names = frozenset(commit)
+            unknown = names.difference(self.forms)
+            if unknown:
+                raise ValueError("Unknown forms in commit: %s"
+                                 % ', '.join(sorted(unknown)))
+        # Skipped optional forms don't have anything to save
         instances = self._combine('save', call=True,
-                                  call_kwargs={'commit': commit})
+                                  call_kwargs={'commit': False},
+                                  exclude=self.skipped_forms)
         if commit:
-            self.save_m2m()
+            with transaction.atomic():
+                self._save_instances(instances, names)
+                self._save_m2m(names)
         return instances
 
+    def _save_instances(self, instances, names=None):
+        """
+        Save the given instances (only the ones of the wrapped forms in
+        ``names`` if given) in the order of the save plan. The foreign keys
+        are only filled in with the instances that are saved.
+        """
+        if names is not None:
+            instances = OrderedDict((name, instance)
+                                    for name, instance in instances.items()
+                                    if name in names)
+        plan = self.get_instance_save_plan()
+        collector = self.instrumentation
+        for name in plan.order:
+            if name in instances:
+                plan.link(name, instances)
+                if collector is None:
+                    self._save_instance(plan, name, instances[name])
+                else:
+                    form_class = type(self.forms[name])
+                    with measure(collector, 'save', name, form_class):
+                        self._save_instance(plan, name, instances[name])
+
+    def _save_instance(self, plan, name, instance):
+        """
+        Save the instance of the wrapped form with the given name (or the
+        instances of a wrapped MultiModelForm, in its own order).
+        """
+        if name in plan.nested:
+            self.forms[name]._save_instances(instance)
+        else:
+            instance.save()
+
     def save_m2m(self):
-        # TODO: Find a good API to wrap this in a db transaction
+        return self._save_m2m()
+
+    def _save_m2m(self, names=None):
+        exclude = self.skipped_forms
+        if names is not None:
+            exclude = exclude.union(set(self.forms).difference(names))
         return self._combine('save_m2m', filter=True, call=True,
-                             ignore_missing=True)
+                             ignore_missing=True, exclude=exclude,
+                             instrument='save_m2m')
+
+    @classmethod
+    def bulk_save(cls, data_list, files_list=None, **kwargs):
+        """
+        Build and validate a multiform for each item of ``data_list`` (and
+        ``files_list``), then save the instances of all the valid ones in one
+        transaction, model by model, using bulk_create where possible.
+        Other keyword arguments are passed to each multiform.
+        Return two lists with one item per row: the saved instances (or None
+        for invalid rows) and the errors.
+        """
+        if files_list is None:
+            files_list = [None] * len(data_list)
+        elif len(files_list) != len(data_list):
+            raise ValueError("bulk_save got %d items in data_list but %d in "
+                             "files_list." % (len(data_list), len(files_list)))
+        forms = [cls(data, files, **kwargs)
+                 for data, files in zip(data_list, files_list)]
+        valid_forms = [form for form in forms if form.is_valid()]
+        rows = cls.bulk_save_forms(valid_forms)
+
+        saved = iter(rows)
+        instances = [next(saved) if form.is_valid() else None
+                     for form in forms]
+        return instances, [form.errors for form in forms]
+
+    @classmethod
+    def bulk_save_forms(cls, forms):
+        """
+        Save the instances of the given (valid) multiforms of this class in
+        one transaction, model by model, using bulk_create where possible.
+        Return a list with the instances of each multiform.
+        """
+        rows = [form.save(commit=False) for form in forms]
+        with transaction.atomic():
+            cls._bulk_save_rows(forms, rows)
+            for form in forms:
+                form.save_m2m()
+        return rows
+
+    @classmethod
+    def _bulk_save_rows(cls, forms, rows):
+        """
+        Save the instances returned by ``save(commit=False)`` for several
+        multiforms of this class, model by model. The rows of a wrapped
+        MultiModelForm are saved by its own class.
+        The multiforms that wrap different forms (when get_base_forms is
+        overridden) are saved separately, each group with its own plan.
+        """
+        groups = OrderedDict()
+        for form, row in zip(forms, rows):
+            base_forms = form.get_init_plan().base_forms
+            groups.setdefault(base_forms, []).append((form, row))
+        for base_forms, group in groups.items():
+            plan = group[0][0].get_instance_save_plan()
+            form_classes = dict(base_forms)
+            for name in plan.order:
+                name_group = [(form, row) for form, row in group
+                              if name in row]
+                for form, row in name_group:
+                    plan.link(name, row)
+                instances = [row[name] for form, row in name_group]
+                if name in plan.nested:
+                    save = partial(form_classes[name]._bulk_save_rows,
+                                   [form.forms[name] for form, row
+                                    in name_group],
+                                   instances)
+                else:
+                    save = partial(save_in_bulk, instances,
+                                   name in plan.parents)
+                if cls.instrumentation is None:
+                    save()
+                else:
+                    with measure(cls.instrumentation, 'save', name,
+                                 form_classes[name]):
+                        save()
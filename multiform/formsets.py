@@ -0,0 +1,197 @@
+"""
+Formsets whose forms are multiforms.
+"""
+import json
+
+from django import forms
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models.query import QuerySet
+from django.forms.formsets import BaseFormSet, formset_factory
+from django.utils.encoding import force_text
+
+from .forms import call_closing_connections, MultiModelForm
+
+
+# The field of the management form that holds the primary keys of the
+# instances of the initial rows
+INSTANCE_PKS = 'INSTANCE_PKS'
+
+
+class BaseMultiFormSet(BaseFormSet):
+    """
+    A formset whose forms are multiforms.
+    All the rows share the InitPlan (and, with share_media, the media) of
+    their class, and they can be validated concurrently by setting
+    ``validation_executor``.
+    """
+    validation_executor = None
+
+    def _construct_form(self, i, **kwargs):
+        form = super(BaseMultiFormSet, self)._construct_form(i, **kwargs)
+        # An extra row is either left empty or validated as a whole (and not
+        # as wrapped forms that are each allowed to be empty).
+        if form.empty_permitted and form.is_bound and form.has_changed():
+            for wrapped_form in form.forms.values():
+                wrapped_form.empty_permitted = False
+        return form
+
+    def full_clean(self):
+        if self.is_bound and self.validation_executor is not None:
+            self._full_clean_concurrently(self.validation_executor)
+        super(BaseMultiFormSet, self).full_clean()
+
+    def _full_clean_concurrently(self, executor):
+        """
+        Run full_clean on the rows that weren't validated yet using the given
+        executor and wait for all of them to finish.
+        Exceptions are re-raised in the order of the rows.
+        The database connections opened by the tasks are closed after them.
+        """
+        futures = [executor.submit(call_closing_connections, form.full_clean)
+                   for form in self.forms if form._errors is None]
+        for future in futures:
+            future.result()
+
+
+class BaseMultiModelFormSet(BaseMultiFormSet):
+    """
+    A formset of MultiModelForms.
+    The items of ``queryset`` (fetched once, with the form's
+    prepare_queryset) are passed as the ``instance`` of the initial rows, in
+    order, and ``save()`` saves the changed rows in bulk.
+    Their primary keys are sent along with the management form so that the
+    rows of a submission get the same instances, even if the queryset
+    changed in the meantime.
+    """
+    queryset = None
+
+    def __init__(self, data=None, files=None, auto_id='id_%s', prefix=None,
+                 queryset=None, **kwargs):
+        if queryset is not None:
+            self.queryset = queryset
+        super(BaseMultiModelFormSet, self).__init__(
+            data, files, auto_id, prefix, **kwargs)
+
+    def get_queryset(self):
+        """
+        Return the list of instances of the initial rows.
+        The rows are matched with the instances by position so a queryset
+        without an ordering is ordered by primary key.
+        """
+        if not hasattr(self, '_queryset'):
+            queryset = self.queryset
+            if queryset is None:
+                queryset = []
+            elif isinstance(queryset, QuerySet):
+                if not queryset.ordered:
+                    queryset = queryset.order_by(queryset.model._meta.pk.name)
+                queryset = self.form.prepare_queryset(queryset)
+            self._queryset = list(queryset)
+        return self._queryset
+
+    def initial_form_count(self):
+        if not self.is_bound:
+            return len(self.get_queryset())
+        return super(BaseMultiModelFormSet, self).initial_form_count()
+
+    @property
+    def management_form(self):
+        form = super(BaseMultiModelFormSet, self).management_form
+        form.fields[INSTANCE_PKS] = forms.CharField(
+            widget=forms.HiddenInput, required=False)
+        if not self.is_bound:
+            form.initial[INSTANCE_PKS] = json.dumps(
+                [force_text(instance.pk) for instance in self.get_queryset()])
+        return form
+
+    def get_submitted_pks(self):
+        """
+        Return the primary keys (as strings) of the instances of the initial
+        rows, as submitted with the management form.
+        """
+        if not hasattr(self, '_submitted_pks'):
+            try:
+                pks = json.loads(self.data.get(self.add_prefix(INSTANCE_PKS),
+                                               '[]'))
+            except ValueError:
+                pks = []
+            if not isinstance(pks, list):
+                pks = []
+            self._submitted_pks = [force_text(pk) for pk in pks]
+        return self._submitted_pks
+
+    def get_initial_instance(self, i):
+        """
+        Return the instance of the initial row ``i``: the i-th item of the
+        queryset for an unbound formset, the item with the i-th submitted
+        primary key otherwise (None if it doesn't exist anymore).
+        """
+        instances = self.get_queryset()
+        if not self.is_bound:
+            return instances[i] if i < len(instances) else None
+        pks = self.get_submitted_pks()
+        if i >= len(pks):
+            return None
+        if not hasattr(self, '_instances_by_pk'):
+            self._instances_by_pk = dict(
+                (force_text(instance.pk), instance) for instance in instances)
+        return self._instances_by_pk.get(pks[i])
+
+    def _construct_form(self, i, **kwargs):
+        if i < self.initial_form_count():
+            instance = self.get_initial_instance(i)
+            if instance is not None:
+                kwargs.setdefault('instance', instance)
+        return super(BaseMultiModelFormSet, self)._construct_form(i, **kwargs)
+
+    def full_clean(self):
+        super(BaseMultiModelFormSet, self).full_clean()
+        if not self.is_bound:
+            return
+        # An initial row whose object is gone would be saved as a new one
+        for i in range(self.initial_form_count()):
+            if self.get_initial_instance(i) is None:
+                self._non_form_errors.append(
+                    "The object of row %d doesn't exist anymore." % (i + 1))
+
+    def get_changed_forms(self):
+        """
+        Return the rows that have changed (unchanged rows aren't saved).
+        """
+        return [form for form in self.forms if form.has_changed()]
+
+    def save(self, commit=True):
+        """
+        Save the instances of the changed rows.
+        With commit=True, they're all saved in one transaction, model by model
+        (see MultiModelForm.bulk_save_forms). Otherwise, the caller has to
+        call save_m2m() after saving the instances.
+        Return a list with the instances of each changed row.
+        """
+        forms = self.get_changed_forms()
+        if commit:
+            return self.form.bulk_save_forms(forms)
+
+        def save_m2m():
+            for form in forms:
+                form.save_m2m()
+        self.save_m2m = save_m2m
+        return [form.save(commit=False) for form in forms]
+
+
+def multiformset_factory(multiform, formset=None, **kwargs):
+    """
+    Return a FormSet class for the given MultiForm class.
+    ``formset`` defaults to BaseMultiModelFormSet for MultiModelForms and to
+    BaseMultiFormSet otherwise. Other keyword arguments are passed to
+    django's formset_factory.
+    """
+    if kwargs.get('can_order') or kwargs.get('can_delete'):
+        raise ImproperlyConfigured("Formsets of multiforms don't support "
+                                   "can_order and can_delete.")
+    if formset is None:
+        if issubclass(multiform, MultiModelForm):
+            formset = BaseMultiModelFormSet
+        else:
+            formset = BaseMultiFormSet
+    return formset_factory(multiform, formset=formset, **kwargs)
@@ -0,0 +1,150 @@
+"""
+Instrumentation of the work that a MultiForm does for each wrapped form.
+
+Set the ``instrumentation`` attribute of a MultiForm (on the class or on an
+instance) to a collector, that is any object with a ``record(event)`` method.
+The collector then receives an Event for each phase of each wrapped form:
+
+* ``init``: the wrapped form is instanciated;
+* ``clean``: the wrapped form is validated;
+* ``render``: the wrapped form is rendered to HTML;
+* ``save`` and ``save_m2m``: the wrapped form's instance (and its
+  many-to-many data) is saved by a MultiModelForm.
+
+When ``instrumentation`` is None (the default), nothing is measured.
+"""
+from __future__ import unicode_literals
+
+from bisect import bisect_left
+from collections import namedtuple
+from timeit import default_timer
+import threading
+
+from django.db import connections
+
+
+Event = namedtuple('Event', 'phase name form_class duration queries')
+
+
+class QueryCounter(object):
+    """
+    Count the database queries (on all connections) run by the current
+    thread between calls to start() and stop(), from the connections' query
+    log. The queries are logged in the meantime even when DEBUG is False
+    (and then removed from the log by stop()).
+    The count is None if a query log is full (it drops the oldest queries)
+    or was reset.
+    """
+    def start(self):
+        self._connections = []
+        for connection in connections.all():
+            self._connections.append((connection,
+                                      connection.force_debug_cursor,
+                                      connection.queries_logged,
+                                      len(connection.queries_log)))
+            connection.force_debug_cursor = True
+
+    def stop(self):
+        count = 0
+        for connection, force_debug_cursor, logged, length in reversed(
+                self._connections):
+            connection.force_debug_cursor = force_debug_cursor
+            queries_log = connection.queries_log
+            executed = len(queries_log) - length
+            if executed < 0 or len(queries_log) == queries_log.maxlen:
+                count = None  # the log was reset or is full
+            elif count is not None:
+                count += executed
+            if not logged:
+                for i in range(executed):
+                    queries_log.pop()
+        return count
+
+
+class measure(object):
+    """
+    Context manager that sends an Event to the collector for the code it
+    wraps (even if that code raises an exception).
+    """
+    def __init__(self, collector, phase, name, form_class):
+        self.collector = collector
+        self.phase = phase
+        self.name = name
+        self.form_class = form_class
+
+    def __enter__(self):
+        self.queries = QueryCounter()
+        self.queries.start()
+        self.start = default_timer()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        duration = default_timer() - self.start
+        self.collector.record(Event(self.phase, self.name, self.form_class,
+                                    duration, self.queries.stop()))
+
+
+class StatsCollector(object):
+    """
+    A thread-safe collector that aggregates the events by form class and
+    phase: number of events, total, minimum and maximum duration, number of
+    queries (and of events whose queries couldn't be counted) and a histogram
+    of the durations.
+    The ``buckets`` are the upper bounds (in seconds) of the histogram's
+    buckets. A last bucket holds the durations above the last bound.
+    """
+    default_buckets = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+
+    def __init__(self, buckets=None):
+        self.buckets = tuple(buckets or self.default_buckets)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+    def record(self, event):
+        key = (event.form_class, event.phase)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = {
+                    'count': 0,
+                    'total': 0.0,
+                    'min': event.duration,
+                    'max': event.duration,
+                    'queries': 0,
+                    'queries_unknown': 0,
+                    'histogram': [0] * (len(self.buckets) + 1),
+                }
+            stats['count'] += 1
+            stats['total'] += event.duration
+            stats['min'] = min(stats['min'], event.duration)
+            stats['max'] = max(stats['max'], event.duration)
+            if event.queries is None:
+                stats['queries_unknown'] += 1
+            else:
+                stats['queries'] += event.queries
+            stats['histogram'][bisect_left(self.buckets,
+                                           event.duration)] += 1
+
+    def export(self):
+        """
+        Return the aggregates as a list of dicts (that can be serialized to
+        JSON), sorted by form class and phase.
+        Form classes are identified by their dotted path.
+        """
+        with self._lock:
+            items = [(form_class, phase, dict(stats))
+                     for (form_class, phase), stats in self._stats.items()]
+        exported = []
+        for form_class, phase, stats in items:
+            stats['form_class'] = '%s.%s' % (form_class.__module__,
+                                             form_class.__name__)
+            stats['phase'] = phase
+            stats['buckets'] = list(self.buckets)
+            stats['histogram'] = list(stats['histogram'])
+            exported.append(stats)
+        exported.sort(key=lambda stats: (stats['form_class'], stats['phase']))
+        return exported
@@ -0,0 +1,193 @@
+"""
+Cleaning wrapped forms in a process pool (see MultiForm.process_forms).
+
+The wrapped form is built again in the worker process from its class and
+its keyword arguments, so they have to be picklable. Uploaded files are sent
+as the path of their temporary file when they have one, or as their
+content. The errors and cleaned_data are sent back to the form of the parent
+process; the uploaded files in cleaned_data are replaced by the parent's
+file objects.
+"""
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile, UploadedFile
+from django.utils.datastructures import MultiValueDict
+from django.utils.encoding import force_text
+
+try:
+    from django.forms.utils import ErrorDict
+except ImportError:  # Django < 1.7
+    from django.forms.util import ErrorDict
+
+
+class FileRef(object):
+    """
+    Stands for an uploaded file in the cleaned_data sent back by a worker:
+    the key of the file in ``files`` and its position in the list.
+    """
+    def __init__(self, key, index):
+        self.key = key
+        self.index = index
+
+
+def marshal_file(f):
+    if hasattr(f, 'temporary_file_path'):
+        source = ('path', f.temporary_file_path())
+    else:
+        f.seek(0)
+        source = ('content', f.read())
+        f.seek(0)
+    return source + (f.name, f.content_type, f.size,
+                     getattr(f, 'charset', None))
+
+
+def unmarshal_file(spec):
+    kind, source, name, content_type, size, charset = spec
+    if kind == 'path':
+        return UploadedFile(open(source, 'rb'), name, content_type, size,
+                            charset)
+    f = SimpleUploadedFile(name, source, content_type)
+    f.charset = charset
+    return f
+
+
+def marshal_files(files):
+    """
+    Return a picklable list of (key, list of files) for the given files.
+    """
+    if not files:
+        return []
+    if hasattr(files, 'lists'):
+        items = files.lists()
+    else:
+        items = ((key, [f]) for key, f in files.items())
+    return [(key, [marshal_file(f) for f in key_files])
+            for key, key_files in items]
+
+
+def marshal_form(form_class, kwargs):
+    """
+    Return the picklable payload that clean_form needs to build and clean
+    a form in a worker process.
+    """
+    kwargs = dict(kwargs)
+    files = marshal_files(kwargs.pop('files', None))
+    return form_class, kwargs, files
+
+
+def clean_form(payload):
+    """
+    Build and clean a form from the payload of marshal_form (in a worker
+    process). Return its errors (field -> list of (message, code)) and its
+    cleaned_data (with FileRefs in place of the uploaded files).
+    """
+    form_class, kwargs, files = payload
+    refs = {}
+    if files:
+        kwargs['files'] = MultiValueDict()
+        for key, specs in files:
+            key_files = [unmarshal_file(spec) for spec in specs]
+            for index, f in enumerate(key_files):
+                refs[id(f)] = FileRef(key, index)
+            kwargs['files'].setlist(key, key_files)
+    try:
+        form = form_class(**kwargs)
+        form.full_clean()
+        errors = error_data(form)
+        cleaned_data = dict(
+            (field_name, replace_files(value, refs))
+            for field_name, value in getattr(form, 'cleaned_data', {}).items())
+    finally:
+        for key, key_files in (kwargs['files'].lists() if files else ()):
+            for f in key_files:
+                f.close()
+    return errors, cleaned_data
+
+
+def replace_files(value, refs):
+    if id(value) in refs:
+        return refs[id(value)]
+    if isinstance(value, list):
+        return [replace_files(item, refs) for item in value]
+    return value
+
+
+def restore_files(value, files):
+    if isinstance(value, FileRef):
+        if hasattr(files, 'getlist'):
+            return files.getlist(value.key)[value.index]
+        return files[value.key]
+    if isinstance(value, list):
+        return [restore_files(item, files) for item in value]
+    return value
+
+
+def apply_result(form, result):
+    """
+    Set the errors and cleaned_data computed by clean_form on the form of
+    the parent process.
+    """
+    errors, cleaned_data = result
+    form._errors = ErrorDict()
+    with_codes = hasattr(form.error_class(), 'as_data')
+    for field_name, messages in errors.items():
+        if with_codes:
+            error_list = [ValidationError(message, code=code)
+                          for message, code in messages]
+        else:
+            error_list = [message for message, code in messages]
+        form._errors[field_name] = form.error_class(error_list)
+    form.cleaned_data = dict(
+        (field_name, restore_files(value, form.files))
+        for field_name, value in cleaned_data.items())
+
+
+def error_data(form):
+    """
+    Return the errors of a form as (field -> list of (message, code)).
+    For a multiform, return them for each wrapped form (name -> errors).
+    """
+    if hasattr(form, 'get_init_plan'):
+        return dict((name, error_data(form.forms[name]))
+                    for name in form.errors)
+    data = {}
+    for field_name, errors in form.errors.items():
+        if hasattr(errors, 'as_data'):
+            data[field_name] = [(force_text(message), error.code)
+                                for error in errors.as_data()
+                                for message in error]
+        else:
+            data[field_name] = [(force_text(message), None)
+                                for message in errors]
+    return data
+
+
+def check_process_results(multiform_class, *args, **kwargs):
+    """
+    Validate two multiforms built with the given arguments: one with the
+    class' process_executor and one that cleans everything in process.
+    Raise an AssertionError if their errors (messages and codes) or their
+    cleaned_data are different. Return the multiform that used the process
+    pool.
+    """
+    in_process_class = type(multiform_class.__name__, (multiform_class,), {
+        'process_executor': None,
+        '__module__': multiform_class.__module__,
+    })
+    offloaded = multiform_class(*args, **kwargs)
+    in_process = in_process_class(*args, **kwargs)
+    offloaded_valid, in_process_valid = (offloaded.is_valid(),
+                                         in_process.is_valid())
+    if offloaded_valid != in_process_valid:
+        raise AssertionError('is_valid() is %s with the process pool and %s '
+                             'without it.' % (offloaded_valid,
+                                              in_process_valid))
+    if error_data(offloaded) != error_data(in_process):
+        raise AssertionError('Different errors: %r != %r' % (
+            error_data(offloaded), error_data(in_process)))
+    for name in offloaded.forms:
+        offloaded_data = getattr(offloaded[name], 'cleaned_data', None)
+        in_process_data = getattr(in_process[name], 'cleaned_data', None)
+        if offloaded_data != in_process_data:
+            raise AssertionError('Different cleaned_data for %s: %r != %r' % (
+                name, offloaded_data, in_process_data))
+    return offloaded
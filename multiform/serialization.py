@@ -0,0 +1,25 @@
+"""
+Encoding the validation results of a MultiForm to JSON.
+"""
+from django.core.files.base import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db.models.query import QuerySet
+
+
+class JSONEncoder(DjangoJSONEncoder):
+    """
+    DjangoJSONEncoder that also encodes the values that forms commonly
+    clean to: model instances (as their primary key), querysets (as a list
+    of primary keys), files (as their name) and sets.
+    """
+    def default(self, o):
+        if isinstance(o, models.Model):
+            return o.pk
+        if isinstance(o, QuerySet):
+            return [instance.pk for instance in o]
+        if isinstance(o, File):
+            return o.name
+        if isinstance(o, (set, frozenset)):
+            return list(o)
+        return super(JSONEncoder, self).default(o)
@@ -0,0 +1,108 @@
+"""
+An upload handler that streams the files of a MultiForm's wrapped forms to
+disk, enforcing their max_upload_sizes while the request is being read.
+"""
+from collections import defaultdict
+
+from django.core.files.uploadedfile import (
+    TemporaryUploadedFile,
+    UploadedFile,
+)
+from django.core.files.uploadhandler import (
+    FileUploadHandler,
+    StopFutureHandlers,
+)
+
+from .forms import match_prefix
+
+
+class RejectedUpload(UploadedFile):
+    """
+    Stands for a file whose content was dropped because its wrapped form's
+    files went over its max_upload_sizes. It has the size of the whole
+    upload, so that the multiform reports the error when it's validated.
+    """
+    rejected = True
+
+    def __init__(self, name, content_type, size, charset=None):
+        super(RejectedUpload, self).__init__(
+            None, name, content_type, size, charset)
+
+    def open(self, mode=None):
+        raise ValueError("The content of a rejected upload was dropped.")
+
+
+class MultiFormUploadHandler(FileUploadHandler):
+    """
+    Route each uploaded file to the wrapped form of ``multiform_class`` that
+    owns it (by prefix) and write it to a temporary file as it's received.
+
+    Once the files of a wrapped form go over its ``max_upload_sizes``, the
+    rest of their content is dropped instead of being stored and the file
+    is replaced by a RejectedUpload. The files that don't belong to any
+    wrapped form are left to the next upload handlers.
+
+    It must be installed before the request's POST or FILES are accessed::
+
+        request.upload_handlers.insert(
+            0, MultiFormUploadHandler(request, DocumentsForm))
+
+    ``prefix`` and the other keyword arguments are the ones given to the
+    multiform, which are needed to know the prefixes of its wrapped forms.
+    """
+    def __init__(self, request=None, multiform_class=None, prefix=None,
+                 **kwargs):
+        super(MultiFormUploadHandler, self).__init__(request)
+        multiform = multiform_class(prefix=prefix, **kwargs)
+        self.prefixes = dict(
+            (wrapped_prefix, name) for name, wrapped_prefix
+            in multiform.get_wrapped_form_prefixes().items() if wrapped_prefix)
+        self.max_sizes = multiform_class.max_upload_sizes
+        # The number of bytes received for each wrapped form
+        self.received = defaultdict(int)
+        self.form_name = None
+
+    def new_file(self, field_name, *args, **kwargs):
+        super(MultiFormUploadHandler, self).new_file(field_name, *args,
+                                                     **kwargs)
+        self.form_name = match_prefix(field_name, self.prefixes)
+        if self.form_name is None:
+            return
+        self.file = None
+        if not self.is_rejected():
+            self.file = TemporaryUploadedFile(
+                self.file_name, self.content_type, 0, self.charset)
+            self.file.content_type_extra = self.content_type_extra
+        raise StopFutureHandlers()
+
+    def is_rejected(self):
+        """
+        Return whether the files of the current wrapped form went over its
+        max_upload_sizes.
+        """
+        max_size = self.max_sizes.get(self.form_name)
+        if max_size is None:
+            return False
+        return self.received[self.form_name] > max_size
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.form_name is None:
+            return raw_data
+        if self.is_rejected():
+            return None
+        self.received[self.form_name] += len(raw_data)
+        if self.is_rejected():
+            # Delete what was already written
+            self.file.close()
+        else:
+            self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        if self.form_name is None:
+            return None
+        if self.is_rejected():
+            return RejectedUpload(self.file_name, self.content_type,
+                                  file_size, self.charset)
+        self.file.seek(0)
+        self.file.size = file_size
+        return self.file
@@ -9,7 +9,7 @@ setup(
     author_email="bmispelon@gmail.com",
     license="MIT",
     url="https://github.com/bmispelon/django-multiform",
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks', 'benchmarks.*']),
     include_package_data=True,
     classifiers=[
        "Operating System :: OS Independent",
@@ -1,8 +1,13 @@
+from collections import OrderedDict
+from functools import partial
+import threading
+
 from django import forms
+from django.db import connections, DEFAULT_DB_ALIAS
 
 from multiform import MultiForm, MultiModelForm, InvalidArgument
 
-from .models import Pizza, Topping
+from .models import Pizza, Restaurant, Topping
 
 
 class EmptyForm(forms.Form):
@@ -22,6 +27,31 @@ class MediaForm(forms.Form):
         js = ('tests.js',)
 
 
+class DynamicMediaForm(forms.Form):
+    @property
+    def media(self):
+        return forms.Media(js=['%s.js' % self.prefix])
+
+
+class MediaWidget(forms.TextInput):
+    class Media:
+        js = ['widget.js']
+
+
+class SwappedWidgetForm(forms.Form):
+    text = forms.CharField()
+
+    def __init__(self, *args, **kwargs):
+        swap_widget = kwargs.pop('swap_widget', False)
+        super(SwappedWidgetForm, self).__init__(*args, **kwargs)
+        if swap_widget:
+            self.fields['text'].widget = MediaWidget()
+
+
+class MultipleChoiceForm(forms.Form):
+    choices = forms.MultipleChoiceField(choices=[('a', 'A'), ('b', 'B')])
+
+
 class MultipartForm(forms.Form):
     file = forms.FileField(required=False)
 
@@ -32,15 +62,64 @@ class CapturingForm(forms.Form):
         super(CapturingForm, self).__init__(*args, **kwargs)
 
 
+class OptionalFooForm(FooForm):
+    def __init__(self, *args, **kwargs):
+        super(OptionalFooForm, self).__init__(*args, **kwargs)
+        self.fields['foo'].required = False
+
+
 class ValidationErrorForm(forms.Form):
     def clean(self):
         raise forms.ValidationError('error')
 
 
+class ThreadRecordingForm(forms.Form):
+    foo = forms.CharField()
+
+    def clean(self):
+        self.thread = threading.current_thread()
+        return super(ThreadRecordingForm, self).clean()
+
+
+class ConnectionRecordingForm(forms.Form):
+    """
+    Records the calls to close_if_unusable_or_obsolete on the connection of
+    the thread that cleans it (only use it in an executor's thread).
+    """
+    closed = []
+
+    def clean(self):
+        connection = connections[DEFAULT_DB_ALIAS]
+        connection.close_if_unusable_or_obsolete = partial(
+            self.closed.append, threading.current_thread())
+        return super(ConnectionRecordingForm, self).clean()
+
+
+class ExceptionForm(forms.Form):
+    def clean(self):
+        raise RuntimeError(self.prefix)
+
+
 class InitialForm(forms.Form):
     baz = forms.CharField(initial='baz', required=False)
 
 
+class RenderCountingForm(forms.Form):
+    foo = forms.CharField()
+    renders = 0
+
+    def _html_output(self, *args, **kwargs):
+        RenderCountingForm.renders += 1
+        return super(RenderCountingForm, self)._html_output(*args, **kwargs)
+
+
+class UserRenderCountingForm(RenderCountingForm):
+    def __init__(self, *args, **kwargs):
+        user = kwargs.pop('user', None)
+        super(UserRenderCountingForm, self).__init__(*args, **kwargs)
+        self.fields['foo'].initial = user
+
+
 class PizzaModelForm(forms.ModelForm):
     class Meta:
         model = Pizza
@@ -59,6 +138,12 @@ class ToppingModelForm(forms.ModelForm):
         fields = ('name',)
 
 
+class RestaurantModelForm(forms.ModelForm):
+    class Meta:
+        model = Restaurant
+        fields = ('name',)
+
+
 SAMPLE_FORMS = [
     ('empty', EmptyForm),
     ('capture', CapturingForm),
@@ -71,6 +156,11 @@ class SampleMultiForm(MultiForm):
     base_forms = SAMPLE_FORMS
 
 
+class LazySampleMultiForm(MultiForm):
+    base_forms = SAMPLE_FORMS
+    lazy_forms = True
+
+
 class MultiFormWithHiddenFields(MultiForm):
     base_forms = [
         ('foo', FooForm),
@@ -90,24 +180,127 @@ class MultiFormWithInvalidArgument(MultiForm):
         return InvalidArgument
 
 
+class MultiFormWithDynamicMedia(MultiForm):
+    base_forms = [
+        ('media', MediaForm),
+        ('dynamic', DynamicMediaForm),
+    ]
+
+
+class MultiFormWithWidgetMedia(MultiForm):
+    base_forms = [
+        ('swapped', SwappedWidgetForm),
+    ]
+
+
 class MultiFormWithFileInput(MultiForm):
     base_forms = [
         ('multipart', MultipartForm),
     ]
 
 
+class MultiFormWithUploadLimits(MultiForm):
+    base_forms = [
+        ('small', MultipartForm),
+        ('large', MultipartForm),
+        ('unlimited', MultipartForm),
+    ]
+    max_upload_sizes = {'small': 10, 'large': 100}
+
+
 class MultiFormWithNonFieldError(MultiForm):
     base_forms = [
         ('error', ValidationErrorForm)
     ]
 
 
+class MultiFormWithThreads(MultiForm):
+    base_forms = [
+        ('first', ThreadRecordingForm),
+        ('second', ThreadRecordingForm),
+        ('third', ThreadRecordingForm),
+    ]
+
+
+class MultiFormWithConnections(MultiForm):
+    base_forms = [
+        ('first', ConnectionRecordingForm),
+        ('second', ConnectionRecordingForm),
+    ]
+
+
+class MultiFormWithExceptions(MultiForm):
+    base_forms = [
+        ('foo', FooForm),
+        ('first', ExceptionForm),
+        ('second', ExceptionForm),
+    ]
+
+
+class PartitionedMultiForm(MultiForm):
+    base_forms = [
+        ('foo', FooForm),
+        ('foobar', FooForm),
+        ('choices', MultipleChoiceForm),
+        ('multipart', MultipartForm),
+    ]
+    partition_data = True
+
+
+class MultiFormWithOptionalForm(MultiForm):
+    base_forms = [
+        ('foo', FooForm),
+        ('optional', FooForm),
+    ]
+    optional_forms = ['optional']
+
+
+class FailFastMultiForm(MultiForm):
+    base_forms = [
+        ('first', FooForm),
+        ('second', ValidationErrorForm),
+        ('third', FooForm),
+    ]
+    fail_fast = True
+
+
 class MultiFormWithInitial(MultiForm):
     base_forms = [
         ('initial', InitialForm),
     ]
 
 
+class RenderCachedMultiForm(MultiForm):
+    base_forms = [
+        ('counting', RenderCountingForm),
+        ('initial', InitialForm),
+    ]
+    render_cache = 'default'
+
+
+class UserRenderCachedMultiForm(MultiForm):
+    base_forms = [
+        ('user', UserRenderCountingForm),
+    ]
+    render_cache = 'default'
+
+
+class PizzaChoiceForm(forms.Form):
+    pizza = forms.ModelChoiceField(Pizza.objects.all())
+
+
+class PizzaChoiceRenderCachedMultiForm(MultiForm):
+    base_forms = [
+        ('choice', PizzaChoiceForm),
+    ]
+    render_cache = 'default'
+    hook_calls = 0
+
+    def dispatch_init_initial(self, name, initial):
+        PizzaChoiceRenderCachedMultiForm.hook_calls += 1
+        return initial
+
+
 class ToppingMultiModelForm(MultiModelForm):
     base_forms = {
         'pizza': PizzaModelForm,
@@ -121,6 +314,26 @@ class ToppingMultiModelForm(MultiModelForm):
             .dispatch_init_instance(name, instance)
 
 
+class DynamicToppingMultiModelForm(ToppingMultiModelForm):
+    """Also saves a restaurant when its name is submitted."""
+    def get_base_forms(self):
+        base_forms = super(DynamicToppingMultiModelForm, self) \
+            .get_base_forms()
+        if 'restaurant-name' in self.data:
+            base_forms['restaurant'] = RestaurantModelForm
+        return base_forms
+
+
+class GetBaseFormsToppingMultiModelForm(ToppingMultiModelForm):
+    base_forms = None
+
+    def get_base_forms(self):
+        return OrderedDict([
+            ('pizza', PizzaModelForm),
+            ('topping', ToppingModelForm),
+        ])
+
+
 class ToppingPizzaRestaurantMultiModelForm(MultiModelForm):
     base_forms = {
         'pizza': PizzaWithRestaurantModelForm,
@@ -132,3 +345,26 @@ class ToppingPizzaRestaurantMultiModelForm(MultiModelForm):
             return instance
         return super(ToppingPizzaRestaurantMultiModelForm, self) \
             .dispatch_init_instance(name, instance)
+
+
+class PrefetchingToppingMultiModelForm(ToppingPizzaRestaurantMultiModelForm):
+    prefetch_related = ['pizza__restaurant']
+
+
+class OptionalToppingMultiModelForm(ToppingMultiModelForm):
+    optional_forms = ['topping']
+
+
+class RestaurantToppingMultiModelForm(MultiModelForm):
+    """The topping can't be saved since there's no pizza to link it to."""
+    base_forms = [
+        ('restaurant', RestaurantModelForm),
+        ('topping', ToppingModelForm),
+    ]
+
+
+class NestedToppingMultiModelForm(MultiModelForm):
+    base_forms = [
+        ('restaurant', RestaurantModelForm),
+        ('menu', ToppingMultiModelForm),
+    ]
@@ -0,0 +1,69 @@
+import asyncio
+
+from django import test
+
+from multiform import MultiForm
+
+from .forms import (
+    FooForm,
+    SampleMultiForm,
+    MultiFormWithExceptions,
+    FailFastMultiForm,
+    MultiFormWithNonFieldError,
+)
+
+
+class AsyncFooForm(FooForm):
+    async def afull_clean(self):
+        await asyncio.sleep(0)
+        self.full_clean()
+        self.cleaned_asynchronously = True
+
+
+class AsyncMultiForm(MultiForm):
+    base_forms = [
+        ('sync', FooForm),
+        ('async', AsyncFooForm),
+        ('nested', SampleMultiForm),
+    ]
+
+
+class TestAsyncValidation(test.TestCase):
+
+    def run_async(self, coroutine):
+        return asyncio.get_event_loop().run_until_complete(coroutine)
+
+    def test_ais_valid(self):
+        data = {'sync-foo': 'a', 'async-foo': 'b', 'nested-foo-foo': 'c'}
+        form = AsyncMultiForm(data)
+        self.assertTrue(self.run_async(form.ais_valid()))
+        self.assertTrue(form['async'].cleaned_asynchronously)
+        sync_form = AsyncMultiForm(data)
+        self.assertTrue(sync_form.is_valid())
+        self.assertEqual(form.cleaned_data, sync_form.cleaned_data)
+
+    def test_same_errors_as_sync(self):
+        form = AsyncMultiForm({'async-foo': 'b'})
+        self.assertFalse(self.run_async(form.ais_valid()))
+        sync_form = AsyncMultiForm({'async-foo': 'b'})
+        self.assertEqual(form.errors, sync_form.errors)
+        self.assertEqual(list(form.errors), ['sync', 'nested'])
+
+        form = MultiFormWithNonFieldError({})
+        self.run_async(form.afull_clean())
+        self.assertEqual(form.non_field_errors(), {'error': ['error']})
+
+    def test_unbound(self):
+        self.assertFalse(self.run_async(AsyncMultiForm().ais_valid()))
+
+    def test_exceptions_propagate_in_order(self):
+        form = MultiFormWithExceptions({})
+        with self.assertRaisesRegexp(RuntimeError, '^first$'):
+            self.run_async(form.afull_clean())
+
+    def test_fail_fast(self):
+        form = FailFastMultiForm({'first-foo': 'yes'})
+        self.assertFalse(self.run_async(form.ais_valid()))
+        self.assertEqual(list(form.errors), ['second'])
+        self.assertEqual(form.unvalidated_forms, ('third',))
+        self.assertIs(form['third']._errors, None)
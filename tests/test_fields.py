@@ -0,0 +1,136 @@
+from django import forms, test
+
+from multiform import MultiForm
+from multiform.fields import CopyOnWriteFields, shared_fields_class
+
+from .forms import (
+    FooForm,
+    MultipleChoiceForm,
+    OptionalFooForm,
+    PizzaModelForm,
+    ToppingModelForm,
+)
+
+
+class StyledForm(forms.Form):
+    name = forms.CharField()
+    code = forms.CharField(required=False)
+
+    def __init__(self, *args, **kwargs):
+        super(StyledForm, self).__init__(*args, **kwargs)
+        for bound_field in self:
+            bound_field.field.widget.attrs['class'] = self.prefix
+        self['name'].field.required = False
+
+    def clean_code(self):
+        self.fields['name'].label = 'Changed'
+        return self.cleaned_data['code']
+
+
+class StyledMultiForm(MultiForm):
+    base_forms = [
+        ('a', StyledForm),
+        ('b', StyledForm),
+    ]
+    share_fields = True
+
+
+class SharedFieldsMultiForm(MultiForm):
+    base_forms = [
+        ('foo', FooForm),
+        ('optional', OptionalFooForm),
+        ('choices', MultipleChoiceForm),
+    ]
+    share_fields = True
+
+
+class SharedFieldsMultiModelForm(MultiForm):
+    base_forms = [
+        ('pizza', PizzaModelForm),
+        ('topping', ToppingModelForm),
+    ]
+    share_fields = True
+
+
+class TestSharedFields(test.TestCase):
+
+    def test_fields_are_shared(self):
+        form1, form2 = SharedFieldsMultiForm(), SharedFieldsMultiForm()
+        self.assertIsInstance(form1['foo'].fields, CopyOnWriteFields)
+        self.assertIsInstance(form1['foo'], FooForm)
+        with form1['foo'].fields.reading():
+            self.assertEqual(list(form1['foo'].fields.values()),
+                             list(FooForm.base_fields.values()))
+            with form2['foo'].fields.reading():
+                self.assertEqual(list(form1['foo'].fields.values()),
+                                 list(form2['foo'].fields.values()))
+
+    def test_changed_fields_are_copied(self):
+        form = SharedFieldsMultiForm()
+        fields = form['optional'].fields
+        self.assertEqual(fields.copied, set(['foo']))
+        self.assertFalse(fields['foo'].required)
+        self.assertTrue(OptionalFooForm.base_fields['foo'].required)
+        self.assertIsNot(fields['foo'], OptionalFooForm.base_fields['foo'])
+
+        field = form['foo'].fields['foo']
+        field.widget.attrs['class'] = 'changed'
+        self.assertIs(form['foo'].fields['foo'], field)
+        self.assertEqual(FooForm.base_fields['foo'].widget.attrs, {})
+
+    def test_iterated_fields_are_copied(self):
+        form = SharedFieldsMultiForm()
+        fields = form['foo'].fields
+        for field in fields.values():
+            field.widget.attrs['class'] = 'changed'
+        self.assertEqual(fields.copied, set(['foo']))
+        self.assertEqual(FooForm.base_fields['foo'].widget.attrs, {})
+
+        fields = form['choices'].fields
+        self.assertIsNot(fields.get('choices'),
+                         MultipleChoiceForm.base_fields['choices'])
+        self.assertIs(fields.get('missing'), None)
+        for name, field in SharedFieldsMultiForm()['choices'].fields.items():
+            self.assertIsNot(field, MultipleChoiceForm.base_fields[name])
+        self.assertNotIn('class', SharedFieldsMultiForm().as_p())
+
+    def test_bound_fields_are_copied(self):
+        form = StyledMultiForm({'a-code': 'x'})
+        self.assertIn('class="a"', form['a'].as_p())
+        self.assertIn('class="b"', form['b'].as_p())
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form['a'].fields['name'].label, 'Changed')
+        self.assertEqual(StyledForm.base_fields['name'].widget.attrs, {})
+        self.assertTrue(StyledForm.base_fields['name'].required)
+        self.assertIsNone(StyledForm.base_fields['name'].label)
+        self.assertNotIn('class', SharedFieldsMultiForm().as_p())
+
+    def test_rendering_doesnt_hand_out_shared_fields(self):
+        form = SharedFieldsMultiForm()
+        form.as_p()
+        form['foo']['foo'].field.widget.attrs['class'] = 'changed'
+        self.assertEqual(FooForm.base_fields['foo'].widget.attrs, {})
+
+    def test_same_results(self):
+        data = {'foo-foo': 'yes', 'choices-choices': ['a']}
+        form = SharedFieldsMultiForm(data)
+        regular = type(str('Regular'), (SharedFieldsMultiForm,),
+                       {'share_fields': False})(data)
+        self.assertHTMLEqual(form.as_p(), regular.as_p())
+        self.assertEqual(form.is_valid(), regular.is_valid())
+        self.assertEqual(form.cleaned_data, regular.cleaned_data)
+        self.assertEqual(form.changed_data, regular.changed_data)
+        # Validating and rendering doesn't copy anything
+        self.assertEqual(form['foo'].fields.copied, set())
+        self.assertEqual(form['choices'].fields.copied, set())
+
+    def test_model_forms(self):
+        data = {'pizza-name': 'Plain', 'topping-name': 'tomato sauce'}
+        form = SharedFieldsMultiModelForm(data)
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['pizza'], {'name': 'Plain'})
+
+    def test_class_cache(self):
+        self.assertIs(shared_fields_class(FooForm),
+                      shared_fields_class(FooForm))
+        self.assertEqual(shared_fields_class(FooForm).__name__, 'FooForm')
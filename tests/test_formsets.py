@@ -0,0 +1,174 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+import threading
+
+from django import test
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from multiform import (
+    BaseMultiFormSet,
+    BaseMultiModelFormSet,
+    multiformset_factory,
+)
+
+from .forms import (
+    MultiFormWithOptionalForm,
+    MultiFormWithThreads,
+    SampleMultiForm,
+    ToppingMultiModelForm,
+)
+from .models import Pizza, Topping
+
+
+def management_data(total, initial=0, instances=()):
+    return {
+        'form-TOTAL_FORMS': str(total),
+        'form-INITIAL_FORMS': str(initial),
+        'form-MAX_NUM_FORMS': '',
+        'form-INSTANCE_PKS': json.dumps([instance.pk
+                                         for instance in instances]),
+    }
+
+
+class TestMultiFormSet(test.TestCase):
+
+    def test_factory(self):
+        formset_class = multiformset_factory(SampleMultiForm, extra=2)
+        self.assertTrue(issubclass(formset_class, BaseMultiFormSet))
+        self.assertFalse(issubclass(formset_class, BaseMultiModelFormSet))
+        formset_class = multiformset_factory(ToppingMultiModelForm)
+        self.assertTrue(issubclass(formset_class, BaseMultiModelFormSet))
+        with self.assertRaises(ImproperlyConfigured):
+            multiformset_factory(SampleMultiForm, can_delete=True)
+
+    def test_rows(self):
+        formset = multiformset_factory(SampleMultiForm, extra=2)()
+        self.assertEqual(len(formset.forms), 2)
+        self.assertEqual(formset.forms[1]['foo'].prefix, 'form-1-foo')
+        self.assertIs(formset.media, formset.forms[0].media)
+        self.assertIn('name="form-TOTAL_FORMS"', formset.as_p())
+        self.assertIn('name="form-1-foo-foo"', formset.as_p())
+
+    def test_validation(self):
+        data = management_data(2)
+        data.update({'form-0-foo-foo': 'yes', 'form-1-optional-foo': 'yes'})
+        formset_class = multiformset_factory(MultiFormWithOptionalForm)
+        formset = formset_class(data)
+        self.assertFalse(formset.is_valid())
+        self.assertEqual(formset.errors[0], {})
+        self.assertEqual(list(formset.errors[1]), ['foo'])
+
+        # Unchanged extra rows are valid
+        data['form-1-optional-foo'] = ''
+        formset = formset_class(data)
+        self.assertTrue(formset.is_valid())
+
+    def test_validation_executor(self):
+        data = management_data(3)
+        for i in range(3):
+            data['form-%d-first-foo' % i] = 'yes'
+        formset_class = multiformset_factory(MultiFormWithThreads, extra=0)
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            formset_class.validation_executor = executor
+            formset = formset_class(data)
+            self.assertFalse(formset.is_valid())
+        threads = set(form['first'].thread for form in formset)
+        self.assertNotIn(threading.current_thread(), threads)
+
+
+class TestMultiModelFormSet(test.TestCase):
+
+    def setUp(self):
+        self.pizza = Pizza.objects.create(name='Plain')
+        self.toppings = [Topping.objects.create(name=name, pizza=self.pizza)
+                         for name in ['tomato sauce', 'cheese']]
+
+    def test_queryset(self):
+        formset_class = multiformset_factory(ToppingMultiModelForm, extra=1)
+        queryset = Topping.objects.select_related('pizza')
+        with self.assertNumQueries(1):
+            formset = formset_class(queryset=queryset)
+            self.assertEqual(len(formset.forms), 3)
+        self.assertEqual(formset.initial_form_count(), 2)
+        self.assertEqual(formset.forms[1]['topping'].instance.name, 'cheese')
+        self.assertEqual(formset.forms[1]['pizza'].instance, self.pizza)
+        self.assertIs(formset.forms[2]['topping'].instance.pk, None)
+
+    def test_save(self):
+        formset_class = multiformset_factory(ToppingMultiModelForm, extra=2)
+        queryset = Topping.objects.select_related('pizza')
+        data = management_data(4, initial=2, instances=self.toppings)
+        data.update({
+            'form-0-pizza-name': 'Plain',
+            'form-0-topping-name': 'tomato sauce',
+            'form-1-pizza-name': 'Plain',
+            'form-1-topping-name': 'mozzarella',
+            'form-2-pizza-name': 'Regina',
+            'form-2-topping-name': 'ham',
+            'form-3-pizza-name': 'Regina',
+            'form-3-topping-name': 'olives',
+        })
+        formset = formset_class(data, queryset=queryset)
+        self.assertTrue(formset.is_valid())
+        with CaptureQueriesContext(connection) as queries:
+            rows = formset.save()
+        self.assertEqual([row['topping'].name for row in rows],
+                         ['mozzarella', 'ham', 'olives'])
+        self.assertEqual(
+            sorted(Topping.objects.values_list('pizza__name', 'name')),
+            [('Plain', 'mozzarella'), ('Plain', 'tomato sauce'),
+             ('Regina', 'ham'), ('Regina', 'olives')])
+
+        # The new toppings are created in bulk
+        topping_inserts = [
+            query for query in queries.captured_queries
+            if 'INSERT INTO "tests_topping"' in query['sql']]
+        self.assertEqual(len(topping_inserts), 1)
+
+    def test_instance_pks(self):
+        """The rows of a submission are matched with their objects by pk."""
+        formset_class = multiformset_factory(ToppingMultiModelForm, extra=0)
+        html = formset_class(queryset=Topping.objects.all()).as_p()
+        self.assertIn('name="form-INSTANCE_PKS"', html)
+        pks = [str(topping.pk) for topping in self.toppings]
+        self.assertIn(json.dumps(pks), html.replace('&quot;', '"'))
+
+        data = management_data(2, initial=2, instances=self.toppings)
+        data.update({
+            'form-0-pizza-name': 'Plain',
+            'form-0-topping-name': 'tomato sauce',
+            'form-1-pizza-name': 'Plain',
+            'form-1-topping-name': 'mozzarella',
+        })
+        # A topping that comes first is added in the meantime
+        Topping.objects.create(name='basil', pizza=self.pizza, pk=0)
+        formset = formset_class(data, queryset=Topping.objects.all())
+        self.assertTrue(formset.is_valid())
+        formset.save()
+        self.assertEqual(Topping.objects.get(pk=self.toppings[1].pk).name,
+                         'mozzarella')
+        self.assertEqual(Topping.objects.get(pk=0).name, 'basil')
+
+        # The second topping is deleted in the meantime
+        self.toppings[1].delete()
+        formset = formset_class(data, queryset=Topping.objects.all())
+        self.assertFalse(formset.is_valid())
+        self.assertEqual(formset.non_form_errors(),
+                         ["The object of row 2 doesn't exist anymore."])
+
+    def test_save_no_commit(self):
+        formset_class = multiformset_factory(ToppingMultiModelForm, extra=1)
+        data = management_data(1)
+        data.update({'form-0-pizza-name': 'Regina',
+                     'form-0-topping-name': 'ham'})
+        formset = formset_class(data, queryset=Topping.objects.none())
+        self.assertTrue(formset.is_valid())
+        rows = formset.save(commit=False)
+        self.assertIs(rows[0]['pizza'].pk, None)
+        rows[0]['pizza'].save()
+        rows[0]['topping'].pizza = rows[0]['pizza']
+        rows[0]['topping'].save()
+        formset.save_m2m()
+        self.assertEqual(Topping.objects.get(name='ham').pizza.name, 'Regina')
@@ -0,0 +1,121 @@
+from django import test
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from multiform.instrumentation import Event, StatsCollector, measure
+
+from .forms import (
+    FooForm,
+    PizzaModelForm,
+    SampleMultiForm,
+    ToppingModelForm,
+    ToppingMultiModelForm,
+)
+
+
+class ListCollector(object):
+    def __init__(self):
+        self.events = []
+
+    def record(self, event):
+        self.events.append(event)
+
+
+class TestInstrumentation(test.TestCase):
+
+    def test_phases(self):
+        collector = ListCollector()
+        form_class = type(str('Instrumented'), (SampleMultiForm,), {
+            'instrumentation': collector,
+        })
+        form = form_class({'foo-foo': 'yes'})
+        self.assertTrue(form.is_valid())
+        form.as_p()
+        names = [name for name, form_class in SampleMultiForm.base_forms]
+        for phase in ['init', 'clean', 'render']:
+            events = [event for event in collector.events
+                      if event.phase == phase]
+            self.assertEqual([event.name for event in events], names)
+        foo_init = collector.events[names.index('foo')]
+        self.assertEqual(foo_init.form_class, FooForm)
+        self.assertGreaterEqual(foo_init.duration, 0)
+
+    def test_save(self):
+        collector = ListCollector()
+        data = {'topping-name': 'tomato sauce', 'pizza-name': 'Plain'}
+        form = ToppingMultiModelForm(data)
+        form.instrumentation = collector
+        self.assertTrue(form.is_valid())
+        form.save()
+        saves = [event for event in collector.events if event.phase == 'save']
+        self.assertEqual([(event.name, event.form_class, event.queries)
+                          for event in saves],
+                         [('pizza', PizzaModelForm, 1),
+                          ('topping', ToppingModelForm, 1)])
+        self.assertEqual(
+            [event.name for event in collector.events
+             if event.phase == 'save_m2m'],
+            ['pizza', 'topping'])
+
+    def test_queries_counted_without_debug(self):
+        """The queries are counted even if they aren't logged."""
+        collector = ListCollector()
+        form = ToppingMultiModelForm({'topping-name': 'tomato sauce',
+                                      'pizza-name': 'Plain'})
+        form.instrumentation = collector
+        self.assertFalse(connection.queries_logged)
+        length = len(connection.queries_log)
+        form.save()
+        self.assertTrue(all(event.queries is not None
+                            for event in collector.events))
+        self.assertEqual(len(connection.queries_log), length)
+        self.assertFalse(connection.force_debug_cursor)
+
+        # The queries that were already logged stay in the log
+        form = ToppingMultiModelForm({'topping-name': 'ham',
+                                      'pizza-name': 'Regina'})
+        form.instrumentation = collector = ListCollector()
+        with CaptureQueriesContext(connection) as queries:
+            form.save()
+        self.assertEqual([event.queries for event in collector.events
+                          if event.phase == 'save'], [1, 1])
+        self.assertEqual(len([query for query in queries.captured_queries
+                              if 'INSERT INTO' in query['sql']]), 2)
+
+    def test_not_configured(self):
+        form = SampleMultiForm({'foo-foo': 'yes'})
+        self.assertIs(form.instrumentation, None)
+        self.assertTrue(form.is_valid())
+
+
+class TestStatsCollector(test.TestCase):
+
+    def test_export(self):
+        collector = StatsCollector(buckets=[0.1, 1])
+        for duration in [0.05, 0.5, 2]:
+            collector.record(Event('clean', 'foo', FooForm, duration, 1))
+        collector.record(Event('init', 'foo', FooForm, 0.01, None))
+        exported = collector.export()
+        self.assertEqual([stats['phase'] for stats in exported],
+                         ['clean', 'init'])
+        clean = exported[0]
+        self.assertEqual(clean['form_class'], 'tests.forms.FooForm')
+        self.assertEqual(clean['count'], 3)
+        self.assertAlmostEqual(clean['total'], 2.55)
+        self.assertEqual((clean['min'], clean['max']), (0.05, 2))
+        self.assertEqual(clean['queries'], 3)
+        self.assertEqual(clean['buckets'], [0.1, 1])
+        self.assertEqual(clean['histogram'], [1, 1, 1])
+        self.assertEqual(clean['queries_unknown'], 0)
+        self.assertEqual(exported[1]['queries'], 0)
+        self.assertEqual(exported[1]['queries_unknown'], 1)
+
+        collector.reset()
+        self.assertEqual(collector.export(), [])
+
+    def test_measure(self):
+        collector = StatsCollector()
+        with self.assertRaises(ValueError):
+            with measure(collector, 'clean', 'foo', FooForm):
+                raise ValueError
+        self.assertEqual(collector.export()[0]['count'], 1)
@@ -1,22 +1,52 @@
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import json
+import threading
 
 from django import test
+from django.db import connection, IntegrityError
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import cache
 from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import QueryDict, StreamingHttpResponse
+from django.utils.datastructures import MultiValueDict
 
-from multiform import MultiForm
+from multiform import InvalidArgument, MultiForm
 
 from .forms import (
     EmptyForm,
+    FooForm,
     SampleMultiForm,
+    LazySampleMultiForm,
     MultiFormWithHiddenFields,
     MultiFormWithInvalidArgument,
     MultiFormWithFileInput,
+    MultiFormWithDynamicMedia,
+    MultiFormWithWidgetMedia,
     MultiFormWithNonFieldError,
     MultiFormWithInitial,
+    PartitionedMultiForm,
+    RenderCachedMultiForm,
+    UserRenderCachedMultiForm,
+    PizzaChoiceRenderCachedMultiForm,
+    RenderCountingForm,
+    MultiFormWithOptionalForm,
+    FailFastMultiForm,
+    MultiFormWithThreads,
+    MultiFormWithConnections,
+    ConnectionRecordingForm,
+    MultiFormWithExceptions,
     SAMPLE_FORMS,
 
     ToppingMultiModelForm,
     ToppingPizzaRestaurantMultiModelForm,
+    RestaurantToppingMultiModelForm,
+    OptionalToppingMultiModelForm,
+    PrefetchingToppingMultiModelForm,
+    NestedToppingMultiModelForm,
+    DynamicToppingMultiModelForm,
+    GetBaseFormsToppingMultiModelForm,
 )
 from .models import Pizza, Restaurant, Topping
 
@@ -39,7 +69,9 @@ class TestMultiForm(test.TestCase):
             make_multiform({})()
 
     def test_init_too_many_positional_args(self):
-        with self.assertRaises(TypeError):
+        msg = (r"^<class 'tests\.forms\.SampleMultiForm'>\.__init__ got too "
+               r"many positional arguments\.$")
+        with self.assertRaisesRegexp(TypeError, msg):
             args = [None] * 20
             SampleMultiForm(*args)
 
@@ -47,10 +79,39 @@ class TestMultiForm(test.TestCase):
         """
         Check that passing an argument both as positional and named fails.
         """
-        with self.assertRaises(TypeError):
+        msg = (r"^<class 'tests\.forms\.SampleMultiForm'>\.__init__ got "
+               r"multiple values for argument 'data'$")
+        with self.assertRaisesRegexp(TypeError, msg):
             # data is the first argument of the signature
             SampleMultiForm(None, data=None)
 
+    def test_init_binder(self):
+        sig_kwargs, extra_kwargs = SampleMultiForm._init_binder(
+            {}, None, 'id_%s', prefix='foo', capture__capture=1, other=2)
+        self.assertEqual(sig_kwargs, dict(MultiForm._baseform_signature,
+                                          data={}, prefix='foo'))
+        self.assertEqual(extra_kwargs, {'capture__capture': 1, 'other': 2})
+        self.assertIs(SampleMultiForm._init_binder, MultiForm._init_binder)
+
+    def test_init_signature_extension(self):
+        """Subclasses can add arguments to the signature."""
+        class CaptureMultiForm(MultiFormWithInvalidArgument):
+            _baseform_signature = OrderedDict(
+                list(MultiForm._baseform_signature.items()) +
+                [('capture', 'default')])
+
+            def _init_parent(self, **kwargs):
+                del kwargs['capture']
+                super(CaptureMultiForm, self)._init_parent(**kwargs)
+
+        form = CaptureMultiForm()
+        self.assertEqual(form['capture'].captured, 'default')
+        args = [None] * len(CaptureMultiForm._baseform_signature)
+        form = CaptureMultiForm(*args[:-1] + ['positional'])
+        self.assertEqual(form['capture'].captured, 'positional')
+        with self.assertRaises(TypeError):
+            CaptureMultiForm(*args + [None])
+
     def test_base_forms(self):
         """
         Check that various types are accepted for the base_forms attribute.
@@ -79,6 +140,58 @@ class TestMultiForm(test.TestCase):
         self.assertEquals('hello', form['capture'].captured)
         self.assertFalse(hasattr(form['foo'], 'captured'))
 
+    def test_init_plan(self):
+        """The plan is compiled once, when the class is created."""
+        plan = SampleMultiForm._init_plan
+        self.assertEqual([name for name, form_class in plan.base_forms],
+                         [name for name, form_class in SAMPLE_FORMS])
+        self.assertEqual(plan.names, frozenset(dict(SAMPLE_FORMS)))
+        self.assertEqual(sorted(plan.dispatch_hooks), ['prefix'])
+        self.assertIs(SampleMultiForm().get_init_plan(), plan)
+
+    def test_init_plan_subclass_hooks(self):
+        plan = MultiFormWithInvalidArgument._init_plan
+        self.assertEqual(sorted(plan.dispatch_hooks), ['capture', 'prefix'])
+        self.assertIs(make_multiform()._init_plan, None)
+
+    def test_get_base_forms_override(self):
+        class ExtraFormMultiForm(MultiForm):
+            base_forms = [('foo', FooForm)]
+
+            def get_base_forms(self):
+                base_forms = super(ExtraFormMultiForm, self).get_base_forms()
+                if self.prefix == 'extra':
+                    base_forms['bar'] = FooForm
+                return base_forms
+
+        self.assertEqual(list(ExtraFormMultiForm().forms), ['foo'])
+        form = ExtraFormMultiForm({}, prefix='extra')
+        self.assertEqual(list(form.forms), ['foo', 'bar'])
+        self.assertEqual(list(form.errors), ['foo', 'bar'])
+        self.assertEqual(list(form.get_base_forms()), ['foo', 'bar'])
+        self.assertEqual(list(ExtraFormMultiForm().forms), ['foo'])
+
+        class NoBaseFormsMultiForm(MultiForm):
+            def get_base_forms(self):
+                return OrderedDict([('foo', FooForm)])
+
+        self.assertEqual(list(NoBaseFormsMultiForm().forms), ['foo'])
+
+    def test_hook_descriptors(self):
+        class DescriptorHooksMultiForm(MultiFormWithInvalidArgument):
+            @classmethod
+            def dispatch_init_capture(cls, name, captured):
+                return captured if name == 'capture' else InvalidArgument
+
+            @staticmethod
+            def dispatch_init_label_suffix(name, label_suffix):
+                return '%s%s' % (name, label_suffix)
+
+        form = DescriptorHooksMultiForm(capture='hello')
+        self.assertEqual(form['capture'].captured, 'hello')
+        self.assertFalse(hasattr(form['foo'], 'captured'))
+        self.assertEqual(form['foo'].label_suffix, 'foo:')
+
     def test_getitem(self):
         form = SampleMultiForm()
         self.assertIsInstance(form['empty'], EmptyForm)
@@ -107,6 +220,20 @@ class TestMultiForm(test.TestCase):
                     '<input id="id_foo-foo" name="foo-foo" type="text" /></p>')
         self.assertHTMLEqual(form.as_p().strip(), expected)
 
+    def test_iter_html(self):
+        form = MultiFormWithHiddenFields()
+        fragments = list(form.iter_as_table())
+        self.assertEqual(len(fragments), 3)  # two forms and a separator
+        self.assertEqual(''.join(fragments), form.as_table())
+        self.assertEqual(''.join(form.iter_as_ul()), form.as_ul())
+        self.assertEqual(''.join(form.iter_as_p()), form.as_p())
+
+    def test_iter_html_streaming_response(self):
+        form = SampleMultiForm()
+        response = StreamingHttpResponse(form.iter_as_p())
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertHTMLEqual(content, form.as_p())
+
     def test_nonfield_errors(self):
         form = MultiFormWithNonFieldError({})
         self.assertFalse(form.is_valid())
@@ -139,6 +266,29 @@ class TestMultiForm(test.TestCase):
         expected = '<script type="text/javascript" src="tests.js"></script>'
         self.assertHTMLEqual(str(form.media), expected)
 
+    def test_media_class_cache(self):
+        form_class = type(str('SharedMediaMultiForm'), (SampleMultiForm,), {
+            'share_media': True,
+        })
+        self.assertFalse(form_class._init_plan.dynamic_media)
+        self.assertIs(form_class().media, form_class().media)
+        self.assertIs(form_class._init_plan.media, form_class().media)
+
+    def test_media_not_shared_by_default(self):
+        """The widgets that an instance sets in __init__ add their media."""
+        form = MultiFormWithWidgetMedia(swap_widget=True)
+        self.assertEqual(form.media._js, ['widget.js'])
+        self.assertEqual(MultiFormWithWidgetMedia().media._js, [])
+        self.assertIs(MultiFormWithWidgetMedia._init_plan.media, None)
+
+    def test_dynamic_media(self):
+        self.assertTrue(MultiFormWithDynamicMedia._init_plan.dynamic_media)
+        form = MultiFormWithDynamicMedia(prefix='a')
+        self.assertEqual(form.media._js, ['tests.js', 'a-dynamic.js'])
+        form = MultiFormWithDynamicMedia(prefix='b')
+        self.assertEqual(form.media._js, ['tests.js', 'b-dynamic.js'])
+        self.assertIs(MultiFormWithDynamicMedia._init_plan.media, None)
+
     def test_multipart(self):
         form = SampleMultiForm()
         self.assertFalse(form.is_multipart())
@@ -153,9 +303,414 @@ class TestMultiForm(test.TestCase):
         form = MultiFormWithHiddenFields()
         self.assertEqual([f.name for f in form.visible_fields()], ['foo'])
 
+    def test_changed_forms(self):
+        """The results follow the changes made to the forms mapping."""
+        form = SampleMultiForm({})
+        del form.forms['empty']
+        self.assertEqual(form.errors,
+                         {'foo': {'foo': ['This field is required.']}})
+
+        form = SampleMultiForm({'foo-foo': 'yes'})
+        self.assertEqual([f.name for f in form], ['foo'])
+        form.forms['foo'] = FooForm({}, prefix='foo')
+        self.assertEqual(list(form.errors), ['foo'])
+        self.assertEqual([f.value() for f in form], [None])
+
+
+class TestAggregateCache(test.TestCase):
+
+    def test_hits_and_misses(self):
+        form = MultiFormWithHiddenFields()
+        self.assertEqual(form.aggregate_cache_info(), (0, 0, 0))
+        fields = form.hidden_fields()
+        self.assertEqual(form.hidden_fields(), fields)
+        form.visible_fields()
+        self.assertEqual(form.aggregate_cache_info(), (1, 2, 2))
+
+    def test_results_are_copies(self):
+        """Changing a result doesn't change the next ones."""
+        form = MultiFormWithHiddenFields()
+        fields = form.hidden_fields()
+        fields.append(None)
+        self.assertEqual(len(form.hidden_fields()), len(fields) - 1)
+        form.visible_fields().append(None)
+        self.assertNotIn(None, form.visible_fields())
+
+        form = MultiFormWithNonFieldError({})
+        form.non_field_errors().clear()
+        self.assertEqual(form.non_field_errors(), {'error': ['error']})
+        form = MultiFormWithInitial({'initial-baz': 'hello'})
+        form.changed_data.pop('initial')
+        self.assertEqual(form.changed_data, {'initial': ['baz']})
+
+    def test_full_clean_clears_cache(self):
+        form = MultiFormWithNonFieldError({})
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.non_field_errors(), {'error': ['error']})
+        form.full_clean()
+        self.assertEqual(form.aggregate_cache_info().size, 0)
+        self.assertEqual(form.non_field_errors(), {'error': ['error']})
+        self.assertEqual(form.aggregate_cache_info().misses, 2)
+
+    def test_data_change_clears_cache(self):
+        form = MultiFormWithInitial({'initial-baz': 'hello'})
+        self.assertEqual(form.changed_data, {'initial': ['baz']})
+        form.data = {}
+        self.assertEqual(form.aggregate_cache_info().size, 0)
+
+
+class TestRenderCache(test.TestCase):
+
+    def setUp(self):
+        cache.clear()
+        RenderCountingForm.renders = 0
+
+    def test_cached(self):
+        html = RenderCachedMultiForm().as_p()
+        self.assertEqual(RenderCountingForm.renders, 1)
+        self.assertEqual(RenderCachedMultiForm().as_p(), html)
+        self.assertEqual(RenderCountingForm.renders, 1)
+        self.assertIn('name="counting-foo"', html)
+        self.assertIn('value="baz"', html)
+        # Other rendering methods have their own entries
+        RenderCachedMultiForm().as_ul()
+        self.assertEqual(RenderCountingForm.renders, 2)
+
+    def test_key(self):
+        RenderCachedMultiForm().as_p()
+        html = RenderCachedMultiForm(prefix='other').as_p()
+        self.assertIn('name="other-counting-foo"', html)
+        html = RenderCachedMultiForm(initial={'baz': 'qux'}).as_p()
+        self.assertIn('value="qux"', html)
+        RenderCachedMultiForm(auto_id=False).as_p()
+        self.assertEqual(RenderCountingForm.renders, 4)
+
+        form_class = type(str('NewVersion'), (RenderCachedMultiForm,), {
+            'render_cache_version': 2,
+        })
+        form_class().as_p()
+        self.assertEqual(RenderCountingForm.renders, 5)
+
+    def test_other_arguments(self):
+        """Forms built with arguments outside of the key aren't cached."""
+        html = UserRenderCachedMultiForm(user__user='alice').as_p()
+        self.assertIn('value="alice"', html)
+        html = UserRenderCachedMultiForm(user__user='bob').as_p()
+        self.assertIn('value="bob"', html)
+        self.assertEqual(RenderCountingForm.renders, 2)
+        UserRenderCachedMultiForm(user__user=None).as_p()
+        UserRenderCachedMultiForm().as_p()
+        self.assertEqual(RenderCountingForm.renders, 3)
+
+    def test_model_instances(self):
+        """Model instances are part of the key by their pk."""
+        plain = Pizza.objects.create(name='Plain')
+        regina = Pizza.objects.create(name='Regina')
+        form_class = PizzaChoiceRenderCachedMultiForm
+        html = form_class(initial={'pizza': plain}).as_p()
+        self.assertIn('value="%d" selected' % plain.pk, html)
+        html = form_class(initial={'pizza': regina}).as_p()
+        self.assertIn('value="%d" selected' % regina.pk, html)
+        self.assertEqual(form_class(initial={'pizza': regina}).as_p(), html)
+
+    def test_unrepresentable_initial(self):
+        """Initial values without a stable representation aren't cached."""
+        RenderCachedMultiForm(initial={'baz': object()}).as_p()
+        RenderCachedMultiForm(initial={'baz': object()}).as_p()
+        self.assertEqual(RenderCountingForm.renders, 2)
+
+    def test_hooks_not_called_again(self):
+        PizzaChoiceRenderCachedMultiForm.hook_calls = 0
+        form = PizzaChoiceRenderCachedMultiForm()
+        form.as_p()
+        form.as_p()
+        self.assertEqual(PizzaChoiceRenderCachedMultiForm.hook_calls, 1)
+
+    def test_bound(self):
+        RenderCachedMultiForm().as_p()
+        html = RenderCachedMultiForm({'counting-foo': 'bound'}).as_p()
+        self.assertIn('value="bound"', html)
+        html = RenderCachedMultiForm({}).as_p()
+        self.assertIn('This field is required.', html)
+        self.assertEqual(RenderCountingForm.renders, 3)
+
+    def test_streaming(self):
+        html = ''.join(RenderCachedMultiForm().iter_as_table())
+        self.assertEqual(''.join(RenderCachedMultiForm().iter_as_table()),
+                         html)
+        self.assertEqual(RenderCountingForm.renders, 1)
+        self.assertEqual(RenderCachedMultiForm().as_table(), html)
+
+
+class TestConcurrentValidation(test.TestCase):
+
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=2)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def test_same_result_as_sequential(self):
+        data = {'first-foo': 'a', 'third-foo': 'c'}
+        sequential = MultiFormWithThreads(data)
+        concurrent = MultiFormWithThreads(data)
+        concurrent.validation_executor = self.executor
+        self.assertEqual(concurrent.is_valid(), sequential.is_valid())
+        self.assertEqual(list(concurrent.errors), ['second'])
+        self.assertEqual(concurrent.errors, sequential.errors)
+
+        data['second-foo'] = 'b'
+        concurrent = MultiFormWithThreads(data)
+        concurrent.validation_executor = self.executor
+        self.assertTrue(concurrent.is_valid())
+        self.assertEqual(list(concurrent.cleaned_data),
+                         ['first', 'second', 'third'])
+        for form in concurrent.forms.values():
+            self.assertIsNot(form.thread, threading.current_thread())
+
+    def test_connections_closed(self):
+        """The connections of the executor's threads are closed."""
+        ConnectionRecordingForm.closed = []
+        form = MultiFormWithConnections({})
+        form.validation_executor = self.executor
+        self.assertTrue(form.is_valid())
+        self.assertEqual(len(ConnectionRecordingForm.closed), 2)
+        self.assertNotIn(threading.current_thread(),
+                         ConnectionRecordingForm.closed)
+
+    def test_exceptions_propagate_in_order(self):
+        form = MultiFormWithExceptions({})
+        form.validation_executor = self.executor
+        with self.assertRaisesRegexp(RuntimeError, '^first$'):
+            form.full_clean()
+
+
+class TestPartitionedData(test.TestCase):
+
+    def test_partition(self):
+        data = QueryDict('foo-foo=1&foobar-foo=2&choices-choices=a'
+                         '&choices-choices=b&other=3')
+        files = MultiValueDict({
+            'multipart-file': [SimpleUploadedFile('test.txt', b'test')],
+        })
+        form = PartitionedMultiForm(data, files)
+        self.assertEqual(form['foo'].data.dict(), {'foo-foo': '1'})
+        self.assertEqual(form['foobar'].data.dict(), {'foobar-foo': '2'})
+        self.assertEqual(form['foo'].files, {})
+        self.assertEqual(list(form['multipart'].files), ['multipart-file'])
+        self.assertIsInstance(form['choices'].data, QueryDict)
+        with self.assertRaises(AttributeError):
+            form['foo'].data['foo-bar'] = 'read-only'
+
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['choices'], {'choices': ['a', 'b']})
+        self.assertEqual(form.cleaned_data['foobar'], {'foo': '2'})
+
+    def test_has_data(self):
+        form = PartitionedMultiForm({'foo-foo': '1', 'initial-foobar-foo': ''})
+        self.assertTrue(form.has_data('foo'))
+        self.assertTrue(form.has_data('foobar'))
+        self.assertFalse(form.has_data('choices'))
+        self.assertFalse(form.has_data('multipart'))
+        self.assertEqual(form['foo'].data, {'foo-foo': '1'})
+
+    def test_prefix(self):
+        form = PartitionedMultiForm({'outer-foo-foo': '1', 'foo-foo': '2'},
+                                    prefix='outer')
+        self.assertEqual(form['foo'].data, {'outer-foo-foo': '1'})
+
+    def test_unbound(self):
+        form = PartitionedMultiForm()
+        self.assertFalse(form['foo'].is_bound)
+        self.assertFalse(form.has_data('foo'))
+
+
+class TestOptionalForms(test.TestCase):
+
+    def test_skipped(self):
+        form = MultiFormWithOptionalForm({'foo-foo': 'yes'})
+        self.assertEqual(form.skipped_forms, frozenset(['optional']))
+        self.assertFalse(form['optional'].is_bound)
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data, {'foo': {'foo': 'yes'},
+                                             'optional': {}})
+
+    def test_not_skipped(self):
+        form = MultiFormWithOptionalForm({'foo-foo': 'yes',
+                                          'optional-foo': ''})
+        self.assertEqual(form.skipped_forms, frozenset())
+        self.assertTrue(form['optional'].is_bound)
+        self.assertFalse(form.is_valid())
+        self.assertEqual(list(form.errors), ['optional'])
+
+    def test_unbound(self):
+        form = MultiFormWithOptionalForm()
+        self.assertEqual(form.skipped_forms, frozenset())
+        self.assertFalse(form.is_valid())
+
+    def test_unknown_optional_form(self):
+        with self.assertRaises(ImproperlyConfigured):
+            type(str('InvalidOptional'), (MultiForm,), {
+                'base_forms': [('foo', EmptyForm)],
+                'optional_forms': ['bar'],
+            })
+
+    def test_save(self):
+        """Skipped wrapped forms are not saved."""
+        form = OptionalToppingMultiModelForm({'pizza-name': 'Plain'})
+        self.assertTrue(form.is_valid())
+        instances = form.save()
+        self.assertEqual(list(instances), ['pizza'])
+        self.assertEqual(Pizza.objects.get(), instances['pizza'])
+        self.assertFalse(Topping.objects.exists())
+
+
+class TestFailFast(test.TestCase):
+
+    def test_stops_at_first_error(self):
+        form = FailFastMultiForm({})
+        self.assertFalse(form.is_valid())
+        self.assertEqual(list(form.errors), ['first'])
+        self.assertEqual(form.unvalidated_forms, ('second', 'third'))
+        self.assertIs(form['second']._errors, None)
+        self.assertIs(form['third']._errors, None)
+
+        form = FailFastMultiForm({'first-foo': 'yes'})
+        self.assertFalse(form.is_valid())
+        self.assertEqual(list(form.errors), ['second'])
+        self.assertEqual(form.unvalidated_forms, ('third',))
+
+    def test_validation_order(self):
+        form_class = type(str('OrderedFailFast'), (FailFastMultiForm,), {
+            'validation_order': ['third', 'second'],
+        })
+        self.assertEqual(form_class._init_plan.validation_order,
+                         ('third', 'second', 'first'))
+        form = form_class({'third-foo': 'yes'})
+        self.assertFalse(form.is_valid())
+        self.assertEqual(list(form.errors), ['second'])
+        self.assertEqual(form.unvalidated_forms, ('first',))
+
+    def test_valid(self):
+        form_class = type(str('ValidFailFast'), (MultiForm,), {
+            'base_forms': [('foo', FooForm), ('empty', EmptyForm)],
+            'fail_fast': True,
+        })
+        form = form_class({'foo-foo': 'yes'})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.unvalidated_forms, ())
+        self.assertEqual(form.cleaned_data, {'foo': {'foo': 'yes'},
+                                             'empty': {}})
+
+
+class TestRevalidate(test.TestCase):
+
+    def test_fixes_errors(self):
+        form = MultiFormWithOptionalForm({'optional-foo': 'yes'})
+        self.assertFalse(form.is_valid())
+        optional = form['optional']
+        foo = form.revalidate('foo', {'foo-foo': 'fixed'})
+        self.assertIs(form['foo'], foo)
+        self.assertIs(form['optional'], optional)
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data, {'foo': {'foo': 'fixed'},
+                                             'optional': {'foo': 'yes'}})
+
+    def test_introduces_errors(self):
+        form = MultiFormWithOptionalForm({'foo-foo': 'yes',
+                                          'optional-foo': 'yes'})
+        self.assertTrue(form.is_valid())
+        form.revalidate('foo', {'foo-foo': ''})
+        self.assertFalse(form.is_valid())
+        self.assertEqual(list(form.errors), ['foo'])
+        self.assertFalse(hasattr(form, 'cleaned_data'))
+
+    def test_only_revalidates_one_form(self):
+        form = MultiFormWithOptionalForm({'foo-foo': 'yes',
+                                          'optional-foo': ''})
+        self.assertFalse(form.is_valid())
+        optional_errors = form['optional']._errors
+        form.revalidate('foo', {'foo-foo': 'other'})
+        self.assertIs(form['optional']._errors, optional_errors)
+        self.assertEqual(list(form.errors), ['optional'])
+
+    def test_optional_form(self):
+        form = MultiFormWithOptionalForm({'foo-foo': 'yes'})
+        self.assertEqual(form.skipped_forms, frozenset(['optional']))
+        form.revalidate('optional', {'optional-foo': ''})
+        self.assertEqual(form.skipped_forms, frozenset())
+        self.assertEqual(list(form.errors), ['optional'])
+        form.revalidate('optional', {})
+        self.assertEqual(form.skipped_forms, frozenset(['optional']))
+        self.assertTrue(form.is_valid())
+
+    def test_partitioned(self):
+        data = {'foo-foo': '', 'foobar-foo': '1'}
+        form = PartitionedMultiForm(data)
+        self.assertFalse(form.is_valid())
+        form.revalidate('foo', {'foo-foo': '2', 'foobar-foo': 'ignored'})
+        self.assertEqual(form['foo'].data, {'foo-foo': '2'})
+        self.assertTrue(form.has_data('foo'))
+        self.assertEqual(form['foobar'].data, {'foobar-foo': '1'})
+
+    def test_fail_fast(self):
+        form = FailFastMultiForm({})
+        self.assertFalse(form.is_valid())
+        form.revalidate('first', {'first-foo': 'yes'})
+        self.assertEqual(list(form.errors), ['second'])
+        self.assertEqual(form.unvalidated_forms, ('third',))
+
+    def test_lazy(self):
+        form = LazySampleMultiForm({})
+        form.revalidate('empty', {})
+        self.assertTrue(form.forms.is_built('empty'))
+        with self.assertRaises(KeyError):
+            form.forms['unknown'] = form['empty']
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            SampleMultiForm().revalidate('empty', {})
+        with self.assertRaises(KeyError):
+            SampleMultiForm({}).revalidate('unknown', {})
+
+
+class TestLazyMultiForm(test.TestCase):
+
+    def test_forms_built_on_access(self):
+        form = LazySampleMultiForm(capture__capture='hello')
+        self.assertEqual(list(form.forms),
+                         [name for name, form_class in SAMPLE_FORMS])
+        self.assertFalse(form.forms.is_built('capture'))
+        self.assertEqual(form['capture'].captured, 'hello')
+        self.assertEqual(form['capture'].prefix, 'capture')
+        self.assertTrue(form.forms.is_built('capture'))
+        self.assertFalse(form.forms.is_built('foo'))
+        self.assertIs(form['capture'], form['capture'])
+
+    def test_unknown_form(self):
+        form = LazySampleMultiForm()
+        with self.assertRaises(KeyError):
+            form['unknown']
+
+    def test_full_clean_builds_everything(self):
+        form = LazySampleMultiForm({'foo-foo': 'yes'})
+        self.assertTrue(form.is_valid())
+        self.assertTrue(all(form.forms.is_built(name) for name in form.forms))
+        self.assertEqual(form.cleaned_data['foo'], {'foo': 'yes'})
+
+    def test_as_p(self):
+        self.assertHTMLEqual(LazySampleMultiForm().as_p(),
+                             SampleMultiForm().as_p())
+
 
 class TestMultiModelForm(test.TestCase):
 
+    def test_init_instance_argument(self):
+        sig_kwargs, extra_kwargs = ToppingMultiModelForm._init_binder(
+            None, None, 'id_%s', None, None, None, ':', False, 'instance')
+        self.assertEqual(sig_kwargs['instance'], 'instance')
+        self.assertEqual(extra_kwargs, {})
+
     def test_dispatch_instance_none(self):
         """When passing instance=None, an empty object is created."""
         form = ToppingMultiModelForm()
@@ -199,3 +754,239 @@ class TestMultiModelForm(test.TestCase):
         self.assertEqual(d['topping'], Topping.objects.get())
         self.assertEqual(d['pizza'].restaurant.get(), Restaurant.objects.get())
         self.assertEqual(d['pizza'], Pizza.objects.get())
+
+    def test_save_plan(self):
+        plan = ToppingMultiModelForm.get_save_plan()
+        self.assertEqual(plan.order, ('pizza', 'topping'))
+        self.assertEqual([(field.name, parent)
+                          for field, parent in plan.links['topping']],
+                         [('pizza', 'pizza')])
+        self.assertEqual(plan.links['pizza'], [])
+
+    def test_save_commit(self):
+        """The topping's foreign key is filled in with the saved pizza."""
+        data = {'topping-name': 'tomato sauce', 'pizza-name': 'Plain'}
+        form = ToppingMultiModelForm(data)
+        self.assertTrue(form.is_valid())
+        d = form.save()
+        self.assertEqual(d['pizza'], Pizza.objects.get())
+        self.assertEqual(Topping.objects.get().pizza, d['pizza'])
+
+    def test_save_commit_m2m(self):
+        restaurant = Restaurant.objects.create(name='Alfredo')
+        data = {
+            'topping-name': 'tomato sauce',
+            'pizza-name': 'Plain',
+            'pizza-restaurant': [restaurant.id]
+        }
+        form = ToppingPizzaRestaurantMultiModelForm(data)
+        self.assertTrue(form.is_valid())
+        d = form.save()
+        self.assertEqual(d['pizza'].restaurant.get(), restaurant)
+        self.assertEqual(d['topping'].pizza, d['pizza'])
+
+    def test_save_partial_commit(self):
+        """Only the instances of the given wrapped forms are saved."""
+        restaurant = Restaurant.objects.create(name='Alfredo')
+        data = {
+            'topping-name': 'tomato sauce',
+            'pizza-name': 'Plain',
+            'pizza-restaurant': [restaurant.id]
+        }
+        form = ToppingPizzaRestaurantMultiModelForm(data)
+        self.assertTrue(form.is_valid())
+        d = form.save(commit=['pizza'])
+        self.assertEqual(d['pizza'], Pizza.objects.get())
+        self.assertEqual(d['pizza'].restaurant.get(), restaurant)
+        self.assertIsNone(d['topping'].pk)
+        self.assertFalse(Topping.objects.exists())
+
+        d['topping'].pizza = d['pizza']
+        d['topping'].save()
+        self.assertEqual(Topping.objects.get().pizza, d['pizza'])
+
+    def test_save_partial_commit_unknown_form(self):
+        form = ToppingMultiModelForm({'topping-name': 'tomato sauce',
+                                      'pizza-name': 'Plain'})
+        self.assertTrue(form.is_valid())
+        with self.assertRaisesRegexp(ValueError, 'restaurant'):
+            form.save(commit=['pizza', 'restaurant'])
+        self.assertFalse(Pizza.objects.exists())
+
+    def test_save_rollback(self):
+        """If an instance can't be saved, none of them are."""
+        data = {'topping-name': 'tomato sauce', 'restaurant-name': 'Alfredo'}
+        form = RestaurantToppingMultiModelForm(data)
+        self.assertTrue(form.is_valid())
+        with self.assertRaises(IntegrityError):
+            form.save()
+        self.assertFalse(Restaurant.objects.exists())
+
+    def test_save_nested(self):
+        """A wrapped MultiModelForm saves its own instances, in order."""
+        data = {'restaurant-name': 'Alfredo', 'menu-pizza-name': 'Plain',
+                'menu-topping-name': 'tomato sauce'}
+        form = NestedToppingMultiModelForm(data)
+        self.assertTrue(form.is_valid())
+        self.assertEqual(NestedToppingMultiModelForm.get_save_plan().nested,
+                         frozenset(['menu']))
+        d = form.save()
+        self.assertEqual(d['restaurant'], Restaurant.objects.get())
+        self.assertEqual(d['menu']['pizza'], Pizza.objects.get())
+        self.assertEqual(Topping.objects.get().pizza, d['menu']['pizza'])
+
+    def test_bulk_save_nested(self):
+        data_list = [
+            {'restaurant-name': 'Alfredo', 'menu-pizza-name': 'Plain',
+             'menu-topping-name': 'tomato sauce'},
+            {'restaurant-name': 'Mario', 'menu-pizza-name': 'Regina',
+             'menu-topping-name': 'ham'},
+        ]
+        instances, errors = NestedToppingMultiModelForm.bulk_save(data_list)
+        self.assertEqual(errors, [{}, {}])
+        self.assertEqual(Restaurant.objects.count(), 2)
+        self.assertEqual(
+            sorted(Topping.objects.values_list('pizza__name', 'name')),
+            [('Plain', 'tomato sauce'), ('Regina', 'ham')])
+        self.assertEqual(instances[1]['menu']['topping'].pizza.name, 'Regina')
+
+    def test_bulk_save(self):
+        data_list = [
+            {'pizza-name': 'Plain', 'topping-name': 'tomato sauce'},
+            {'pizza-name': 'Plain'},
+            {'pizza-name': 'Regina', 'topping-name': 'ham'},
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            instances, errors = ToppingMultiModelForm.bulk_save(data_list)
+        self.assertIs(instances[1], None)
+        self.assertEqual(errors[0], {})
+        self.assertEqual(list(errors[1]), ['topping'])
+        self.assertEqual(
+            sorted(Topping.objects.values_list('pizza__name', 'name')),
+            [('Plain', 'tomato sauce'), ('Regina', 'ham')])
+        self.assertEqual(instances[2]['pizza'],
+                         Pizza.objects.get(name='Regina'))
+
+        # The toppings don't have any dependents, they're created in bulk.
+        topping_inserts = [
+            query for query in queries.captured_queries
+            if 'INSERT INTO "tests_topping"' in query['sql']]
+        self.assertEqual(len(topping_inserts), 1)
+
+    def test_bulk_save_dynamic_base_forms(self):
+        data_list = [
+            {'pizza-name': 'Plain', 'topping-name': 'tomato sauce',
+             'restaurant-name': 'Alfredo'},
+            {'pizza-name': 'Regina', 'topping-name': 'ham'},
+        ]
+        instances, errors = DynamicToppingMultiModelForm.bulk_save(data_list)
+        self.assertEqual(errors, [{}, {}])
+        self.assertEqual(Restaurant.objects.get().name, 'Alfredo')
+        self.assertNotIn('restaurant', instances[1])
+        self.assertEqual(
+            sorted(Topping.objects.values_list('pizza__name', 'name')),
+            [('Plain', 'tomato sauce'), ('Regina', 'ham')])
+
+        data_list = [{'pizza-name': 'Margherita', 'topping-name': 'basil'}]
+        instances, errors = GetBaseFormsToppingMultiModelForm.bulk_save(
+            data_list)
+        self.assertEqual(errors, [{}])
+        self.assertEqual(instances[0]['topping'].pizza.name, 'Margherita')
+        self.assertEqual(Topping.objects.count(), 3)
+
+    def test_bulk_save_files_list_length(self):
+        with self.assertRaisesRegexp(ValueError, 'files_list'):
+            ToppingMultiModelForm.bulk_save([{}], [None, None])
+
+    def test_prepare_queryset(self):
+        queryset = ToppingMultiModelForm.prepare_queryset(
+            Topping.objects.all())
+        self.assertEqual(queryset.query.select_related, {'pizza': {}})
+        queryset = RestaurantToppingMultiModelForm.prepare_queryset(
+            Topping.objects.all())
+        self.assertIs(queryset.query.select_related, False)
+
+    def test_prepare_queryset_without_base_forms(self):
+        form_class = GetBaseFormsToppingMultiModelForm
+        with self.assertRaisesRegexp(ImproperlyConfigured, 'select_related'):
+            form_class.for_queryset(Topping.objects.all())
+
+        form_class = type(str('SelectRelated'), (form_class,),
+                          {'select_related': ['pizza']})
+        pizza = Pizza.objects.create(name='Plain')
+        Topping.objects.create(pizza=pizza, name='tomato sauce')
+        with self.assertNumQueries(1):
+            forms = form_class.for_queryset(Topping.objects.all())
+        self.assertEqual(forms[0]['pizza'].instance, pizza)
+
+    def test_for_queryset(self):
+        """The number of queries doesn't depend on the number of rows."""
+        restaurant = Restaurant.objects.create(name='Alfredo')
+
+        def create_rows(count):
+            for i in range(count):
+                pizza = Pizza.objects.create(name='Pizza %d' % i)
+                pizza.restaurant.add(restaurant)
+                Topping.objects.create(pizza=pizza, name='Topping %d' % i)
+
+        def build_forms():
+            forms = PrefetchingToppingMultiModelForm.for_queryset(
+                Topping.objects.order_by('pk'))
+            for form in forms:
+                # The initial data includes the many-to-many values
+                form['pizza'].initial, form['topping'].initial
+            return forms
+
+        create_rows(1)
+        with CaptureQueriesContext(connection) as one_row:
+            build_forms()
+        create_rows(4)
+        with CaptureQueriesContext(connection) as five_rows:
+            forms = build_forms()
+        self.assertEqual(len(forms), 5)
+        self.assertEqual(len(five_rows), len(one_row))
+        self.assertEqual(len(one_row), 2)
+        self.assertEqual(forms[4]['pizza'].instance.name, 'Pizza 3')
+        self.assertEqual(forms[4]['pizza'].initial['restaurant'],
+                         [restaurant.pk])
+
+
+class TestFieldIndex(test.TestCase):
+
+    def test_field_index(self):
+        form = MultiFormWithHiddenFields(prefix='outer')
+        self.assertEqual(form.field_index(), {
+            'outer-foo-foo': ('foo', 'foo'),
+            'outer-hidden-bar': ('hidden', 'bar'),
+        })
+        bound_field = form.get_bound_field('outer-hidden-bar')
+        self.assertIs(bound_field.form, form['hidden'])
+        self.assertEqual(bound_field.html_name, 'outer-hidden-bar')
+        with self.assertRaises(KeyError):
+            form.get_bound_field('outer-foo-bar')
+
+    def test_nested(self):
+        form = make_multiform([('nested', MultiFormWithHiddenFields)])()
+        self.assertEqual(form.field_index()['nested-foo-foo'],
+                         ('nested', 'nested-foo-foo'))
+        self.assertEqual(form.get_bound_field('nested-foo-foo').html_name,
+                         'nested-foo-foo')
+
+    def test_errors(self):
+        form = MultiFormWithNonFieldError({})
+        self.assertEqual(form.prefixed_errors, {'error-__all__': ['error']})
+        form = MultiFormWithHiddenFields({'hidden-bar': 'yes'})
+        self.assertEqual(form.get_field_errors('foo-foo'),
+                         ['This field is required.'])
+        self.assertEqual(form.get_field_errors('hidden-bar'), [])
+        self.assertEqual(form.prefixed_errors,
+                         {'foo-foo': ['This field is required.']})
+        self.assertEqual(
+            json.loads(json.dumps(form.prefixed_errors)),
+            {'foo-foo': ['This field is required.']})
+
+        nested = make_multiform([('nested', MultiFormWithHiddenFields)])({})
+        self.assertEqual(list(nested.prefixed_errors),
+                         ['nested-foo-foo', 'nested-hidden-bar'])
+        self.assertEqual(nested.get_field_errors('nested-hidden-bar'),
+                         ['This field is required.'])
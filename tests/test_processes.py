@@ -0,0 +1,124 @@
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import io
+import os
+
+from django import forms, test
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils.datastructures import MultiValueDict
+
+from multiform import MultiForm
+from multiform.processes import check_process_results
+
+from .forms import FooForm, PizzaModelForm
+
+
+class CSVForm(forms.Form):
+    rows = forms.FileField()
+
+    def clean_rows(self):
+        f = self.cleaned_data['rows']
+        rows = list(csv.reader(io.StringIO(f.read().decode('utf-8'))))
+        if any(len(row) != 2 for row in rows):
+            raise forms.ValidationError('Each row needs 2 columns.',
+                                        code='columns')
+        return f
+
+
+class PidForm(forms.Form):
+
+    def clean(self):
+        cleaned_data = super(PidForm, self).clean()
+        cleaned_data['pid'] = os.getpid()
+        return cleaned_data
+
+
+class ImportMultiForm(MultiForm):
+    base_forms = [
+        ('foo', FooForm),
+        ('csv', CSVForm),
+    ]
+    process_forms = ['csv']
+
+
+def csv_file(content):
+    return MultiValueDict({
+        'csv-rows': [SimpleUploadedFile('rows.csv', content, 'text/csv')],
+    })
+
+
+class TestProcessPool(test.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestProcessPool, cls).setUpClass()
+        cls.executor = ProcessPoolExecutor(max_workers=1)
+        ImportMultiForm.process_executor = cls.executor
+
+    @classmethod
+    def tearDownClass(cls):
+        ImportMultiForm.process_executor = None
+        cls.executor.shutdown()
+        super(TestProcessPool, cls).tearDownClass()
+
+    def test_valid(self):
+        files = csv_file(b'a,1\nb,2\n')
+        form = check_process_results(ImportMultiForm, {'foo-foo': 'x'}, files)
+        self.assertTrue(form.is_valid())
+        # The uploaded files are the parent's file objects
+        self.assertIs(form.cleaned_data['csv']['rows'],
+                      files.getlist('csv-rows')[0])
+
+    def test_invalid(self):
+        form = check_process_results(ImportMultiForm, {}, csv_file(b'a\n'))
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors['csv'].as_data()['rows'][0].code,
+                         'columns')
+        self.assertEqual(form['foo'].errors,
+                         {'foo': ['This field is required.']})
+
+    def test_missing_file(self):
+        form = check_process_results(ImportMultiForm, {'foo-foo': 'x'})
+        self.assertEqual(list(form.errors), ['csv'])
+
+    def test_unbound(self):
+        form = ImportMultiForm()
+        self.assertFalse(form._cleans_in_process('csv'))
+        self.assertFalse(form.is_valid())
+
+    def test_revalidate(self):
+        form = ImportMultiForm({'foo-foo': 'x'}, csv_file(b'a\n'))
+        self.assertFalse(form.is_valid())
+        form.revalidate('csv', {}, csv_file(b'a,1\n'))
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['csv']['rows'].name, 'rows.csv')
+
+    def test_check_process_results(self):
+        class PidMultiForm(MultiForm):
+            base_forms = [('pid', PidForm)]
+            process_forms = ['pid']
+            process_executor = self.executor
+
+        form = PidMultiForm({})
+        self.assertTrue(form.is_valid())
+        self.assertNotEqual(form.cleaned_data['pid']['pid'], os.getpid())
+        with self.assertRaisesRegexp(AssertionError, 'Different cleaned_data'):
+            check_process_results(PidMultiForm, {})
+
+
+class TestProcessFormsConfiguration(test.TestCase):
+
+    def test_unknown_name(self):
+        with self.assertRaisesRegexp(ImproperlyConfigured, 'missing'):
+            type(str('UnknownProcessForm'), (MultiForm,), {
+                'base_forms': [('foo', FooForm)],
+                'process_forms': ['missing'],
+            })
+
+    def test_model_form(self):
+        with self.assertRaisesRegexp(ImproperlyConfigured, 'pizza'):
+            type(str('ModelProcessForm'), (MultiForm,), {
+                'base_forms': [('pizza', PizzaModelForm)],
+                'process_forms': ['pizza'],
+            })
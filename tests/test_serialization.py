@@ -0,0 +1,138 @@
+from datetime import date
+import json
+
+from django import forms, test
+
+from multiform import MultiForm
+from multiform.forms import NestedData
+from multiform.serialization import JSONEncoder
+
+from .forms import (
+    FailFastMultiForm,
+    FooForm,
+    MultipleChoiceForm,
+    MultiFormWithOptionalForm,
+    PizzaModelForm,
+)
+from .models import Pizza
+
+
+class DateForm(forms.Form):
+    date = forms.DateField()
+
+
+class JSONMultiForm(MultiForm):
+    base_forms = [
+        ('foo', FooForm),
+        ('choices', MultipleChoiceForm),
+        ('date', DateForm),
+    ]
+
+
+class NestedJSONMultiForm(MultiForm):
+    base_forms = [
+        ('nested', JSONMultiForm),
+        ('optional', MultiFormWithOptionalForm),
+    ]
+
+
+class TestFromJSON(test.TestCase):
+
+    def test_dispatch(self):
+        form = JSONMultiForm.from_json(
+            '{"foo": {"foo": "yes"}, "choices": {"choices": ["a", "b"]},'
+            ' "date": {"date": "2013-05-01"}}')
+        self.assertIsInstance(form.data, NestedData)
+        self.assertEqual(form['foo'].data, {'foo': 'yes'})
+        self.assertIs(form['foo'].prefix, None)
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['choices'],
+                         {'choices': ['a', 'b']})
+        self.assertEqual(form.cleaned_data['date'],
+                         {'date': date(2013, 5, 1)})
+
+    def test_nested(self):
+        form = NestedJSONMultiForm.from_json({
+            'nested': {'foo': {'foo': 'yes'}, 'choices': {'choices': ['c']}},
+            'optional': {'foo': {'foo': 'yes'}},
+        })
+        self.assertIsInstance(form['nested'].data, NestedData)
+        self.assertEqual(form['nested']['foo'].data, {'foo': 'yes'})
+        self.assertEqual(form['optional'].skipped_forms,
+                         frozenset(['optional']))
+        self.assertEqual(form.json_errors(), {'nested': {
+            'choices': {'choices': [
+                'Select a valid choice. c is not one of the available '
+                'choices.']},
+            'date': {'date': ['This field is required.']},
+        }})
+
+    def test_invalid_parts(self):
+        form = JSONMultiForm.from_json(b'{"foo": "yes", "choices": null}')
+        self.assertEqual(form['foo'].data, {})
+        self.assertEqual(list(form.json_errors()),
+                         ['foo', 'choices', 'date'])
+
+    def test_invalid_document(self):
+        for document in ['"x"', '[1, 2]', '1', 'null', [1, 2]]:
+            form = JSONMultiForm.from_json(document)
+            self.assertEqual(form.data, {})
+            self.assertEqual(list(form.json_errors()),
+                             ['foo', 'choices', 'date'])
+        with self.assertRaises(ValueError):
+            JSONMultiForm.from_json('{')
+
+
+class TestJSONPayload(test.TestCase):
+
+    def test_valid(self):
+        form = JSONMultiForm.from_json({
+            'foo': {'foo': 'yes'},
+            'choices': {'choices': ['a']},
+            'date': {'date': '2013-05-01'},
+        })
+        payload = ''.join(form.iter_json())
+        self.assertEqual(json.loads(payload), {
+            'valid': True,
+            'cleaned_data': {
+                'foo': {'foo': 'yes'},
+                'choices': {'choices': ['a']},
+                'date': {'date': '2013-05-01'},
+            },
+        })
+        self.assertNotIn(' ', payload.replace('"valid"', ''))
+
+    def test_errors(self):
+        form = JSONMultiForm.from_json({'foo': {'foo': 'yes'}})
+        self.assertEqual(json.loads(''.join(form.iter_json())), {
+            'valid': False,
+            'errors': {
+                'choices': {'choices': ['This field is required.']},
+                'date': {'date': ['This field is required.']},
+            },
+        })
+
+    def test_fail_fast(self):
+        form = FailFastMultiForm.from_json({'first': {'foo': 'yes'}})
+        self.assertEqual(form.get_json_payload(), {
+            'valid': False,
+            'errors': {'second': {'__all__': ['error']}},
+            'unvalidated_forms': ['third'],
+        })
+
+    def test_encoder(self):
+        pizza = Pizza.objects.create(name='Plain')
+        self.assertEqual(json.dumps({
+            'pizza': pizza,
+            'pizzas': Pizza.objects.all(),
+            'set': set([1]),
+        }, cls=JSONEncoder, sort_keys=True),
+            '{"pizza": %d, "pizzas": [%d], "set": [1]}' % (pizza.pk, pizza.pk))
+
+    def test_model_form(self):
+        form_class = type(str('PizzaMultiForm'), (MultiForm,), {
+            'base_forms': [('pizza', PizzaModelForm)],
+        })
+        form = form_class.from_json({'pizza': {'name': 'Plain'}})
+        self.assertEqual(json.loads(''.join(form.iter_json())), {
+            'valid': True, 'cleaned_data': {'pizza': {'name': 'Plain'}}})
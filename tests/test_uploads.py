@@ -0,0 +1,141 @@
+from django import forms, test
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import (
+    SimpleUploadedFile,
+    TemporaryUploadedFile,
+)
+from django.test.client import RequestFactory
+from django.utils.datastructures import MultiValueDict
+
+from multiform import MultiForm
+from multiform.uploads import MultiFormUploadHandler, RejectedUpload
+
+from .forms import MultiFormWithUploadLimits, MultipartForm, SampleMultiForm
+
+
+def upload(name, size):
+    return SimpleUploadedFile(name, b'x' * size)
+
+
+class ReadingForm(forms.Form):
+    file = forms.FileField()
+
+    def clean_file(self):
+        self.content = self.cleaned_data['file'].read()
+        return self.cleaned_data['file']
+
+
+class ReadingMultiForm(MultiForm):
+    base_forms = [
+        ('small', ReadingForm),
+        ('other', ReadingForm),
+    ]
+    max_upload_sizes = {'small': 10}
+
+
+class TestMaxUploadSizes(test.TestCase):
+
+    def test_valid(self):
+        files = MultiValueDict({
+            'small-file': [upload('small.txt', 10)],
+            'large-file': [upload('large.txt', 100)],
+        })
+        form = MultiFormWithUploadLimits({}, files)
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['small']['file'].name, 'small.txt')
+
+    def test_too_big(self):
+        files = {'small-file': upload('small.txt', 11),
+                 'unlimited-file': upload('big.txt', 1000)}
+        form = MultiFormWithUploadLimits({}, files)
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors, {'small': {'file': [
+            "The files of this form can't be bigger than 10\xa0bytes "
+            "in total."]}})
+        self.assertNotIn('file', form['small'].cleaned_data)
+
+    def test_too_big_not_read(self):
+        """The rejected files are removed before the form is cleaned."""
+        files = MultiValueDict({'small-file': [upload('small.txt', 11)],
+                                'other-file': [upload('other.txt', 11)]})
+        form = ReadingMultiForm({}, files)
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors, {'small': {'file': [
+            "The files of this form can't be bigger than 10\xa0bytes "
+            "in total."]}})
+        self.assertFalse(hasattr(form['small'], 'content'))
+        self.assertNotIn('small-file', form['small'].files)
+        self.assertEqual(form['other'].content, b'x' * 11)
+        self.assertIn('small-file', files)
+
+    def test_unknown_forms(self):
+        with self.assertRaises(ImproperlyConfigured):
+            type(str('UnknownLimits'), (MultiForm,), {
+                'base_forms': [('file', MultipartForm)],
+                'max_upload_sizes': {'other': 10},
+            })
+        with self.assertRaises(ImproperlyConfigured):
+            type(str('NestedLimits'), (MultiForm,), {
+                'base_forms': [('nested', SampleMultiForm)],
+                'max_upload_sizes': {'nested': 10},
+            })
+
+
+class TestUploadHandler(test.TestCase):
+
+    def post(self, files, chunk_size=1024):
+        request = RequestFactory().post('/', dict(
+            (key, upload(name, size)) for key, (name, size) in files.items()))
+        handler = MultiFormUploadHandler(request, MultiFormWithUploadLimits)
+        handler.chunk_size = chunk_size
+        request.upload_handlers.insert(0, handler)
+        return request, handler
+
+    def test_routing(self):
+        request, handler = self.post({
+            'small-file': ('small.txt', 10),
+            'large-file': ('large.txt', 50),
+            'other': ('other.txt', 20),
+        })
+        self.assertIsInstance(request.FILES['small-file'],
+                              TemporaryUploadedFile)
+        self.assertEqual(request.FILES['large-file'].read(), b'x' * 50)
+        self.assertNotIsInstance(request.FILES['other'],
+                                 TemporaryUploadedFile)
+        self.assertEqual(dict(handler.received), {'small': 10, 'large': 50})
+        form = MultiFormWithUploadLimits(request.POST, request.FILES)
+        self.assertTrue(form.is_valid())
+
+    def test_rejected(self):
+        request, handler = self.post({
+            'small-file': ('small.txt', 100000),
+            'unlimited-file': ('big.txt', 1000),
+        })
+        rejected = request.FILES['small-file']
+        self.assertIsInstance(rejected, RejectedUpload)
+        self.assertEqual(rejected.size, 100000)
+        # The content stopped being stored as soon as it went over the limit
+        self.assertLess(handler.received['small'], 10000)
+        self.assertEqual(request.FILES['unlimited-file'].size, 1000)
+        form = MultiFormWithUploadLimits(request.POST, request.FILES)
+        self.assertFalse(form.is_valid())
+        self.assertEqual(list(form.errors), ['small'])
+
+    def test_rejected_not_read(self):
+        request = RequestFactory().post('/', {
+            'small-file': upload('small.txt', 100000),
+            'other-file': upload('other.txt', 5)})
+        request.upload_handlers.insert(
+            0, MultiFormUploadHandler(request, ReadingMultiForm))
+        form = ReadingMultiForm(request.POST, request.FILES)
+        self.assertFalse(form.is_valid())
+        self.assertEqual(list(form.errors), ['small'])
+        self.assertEqual(form['other'].content, b'x' * 5)
+
+    def test_prefix(self):
+        request = RequestFactory().post('/', {
+            'outer-small-file': upload('small.txt', 5)})
+        request.upload_handlers.insert(0, MultiFormUploadHandler(
+            request, MultiFormWithUploadLimits, prefix='outer'))
+        self.assertIsInstance(request.FILES['outer-small-file'],
+                              TemporaryUploadedFile)